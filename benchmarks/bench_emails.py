@@ -0,0 +1,115 @@
+"""Correctness and throughput gate for the email extraction engine.
+
+Checks extract_emails / extract_page_emails against the fixture corpus in
+fixtures/email_corpus.json, then measures throughput on synthetic homepage
+text against the previous implementation (kept below as the baseline).
+Exits non-zero if any corpus case fails or the engine is not faster.
+
+    python benchmarks/bench_emails.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from newmarkets import extract_emails, extract_page_emails, parse_page  # noqa: E402
+
+CORPUS_PATH = os.path.join(BENCH_DIR, 'fixtures', 'email_corpus.json')
+
+def baseline_extract_emails(text):
+    """The regex-per-candidate extractor this engine replaced."""
+    potential_emails = re.findall(r'\S+@\S+', text)
+    valid_emails = set()
+    for email in potential_emails:
+        email = re.sub(r'^[^\w]+', '', email)
+        email = re.sub(r'[^\w]+$', '', email)
+        match = re.search(r'[\w\.-]+@[\w\.-]+\.\w{2,}', email)
+        if match:
+            email = match.group(0)
+            if baseline_is_valid_email(email):
+                valid_emails.add(email)
+    return valid_emails
+
+def baseline_is_valid_email(email):
+    unwanted_domains = [
+        'domain.com', 'latofonts.com', 'wixpress.com', 'example.com',
+        'yourdomain.com', 'placeholder.com', 'email.com', 'sentry.wixpress.com', 'sentry-next.wixpress.com'
+    ]
+    unwanted_prefixes = [
+        'user@', 'team@', 'info@mysite.com', 'noreply@', 'no-reply@',
+        'support@', 'admin@', 'webmaster@', 'test@', 'example@'
+    ]
+    email_lower = email.lower()
+    domain = email_lower.split('@')[-1]
+    if domain in unwanted_domains:
+        return False
+    if any(email_lower.startswith(prefix) for prefix in unwanted_prefixes):
+        return False
+    if not (5 <= len(email) <= 254):
+        return False
+    if not all(ord(c) < 128 for c in email):
+        return False
+    if re.search(r'\d{5,}', email):
+        return False
+    if not re.match(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$', email):
+        return False
+    return True
+
+def check_corpus():
+    failures = 0
+    baseline_failures = 0
+    with open(CORPUS_PATH) as f:
+        cases = json.load(f)
+    for case in cases:
+        expected = set(case['expected'])
+        if 'html' in case:
+            page = parse_page(case['html'])
+            got = extract_page_emails(page, case['html'])
+            baseline = baseline_extract_emails(page.text)
+        else:
+            got = extract_emails(case['text'])
+            baseline = baseline_extract_emails(case['text'])
+        if got != expected:
+            failures += 1
+            print(f"FAIL {case['name']}: expected {sorted(expected)}, got {sorted(got)}")
+        if baseline != expected:
+            baseline_failures += 1
+    print(f"Corpus: {len(cases) - failures}/{len(cases)} cases pass (baseline: {len(cases) - baseline_failures}/{len(cases)})")
+    return failures == 0
+
+def synthetic_text(size, rng):
+    words = ('menu brunch happy hour tacos margaritas private events reservations catering gift cards '
+             'open daily 11am-10pm patio parking downtown dallas texas order online follow us').split()
+    addresses = ['info@taqueria.com', 'events@jose.mx', 'jobs@residenttaqueria.comcontact', '@dallastacos',
+                 'logo@2x.png', 'hello@smokehouse.restaurant', 'noreply@wixpress.com']
+    parts = []
+    length = 0
+    while length < size:
+        part = rng.choice(addresses) if rng.random() < 0.01 else rng.choice(words)
+        parts.append(part)
+        length += len(part) + 1
+    return ' '.join(parts)
+
+def throughput(fn, text, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    elapsed = (time.perf_counter() - start) / repeat
+    return len(text) / elapsed / 1_000_000
+
+def main():
+    corpus_ok = check_corpus()
+    text = synthetic_text(2_000_000, random.Random(0))
+    baseline = throughput(baseline_extract_emails, text)
+    engine = throughput(extract_emails, text)
+    print(f"Throughput: engine {engine:.1f} MB/s, baseline {baseline:.1f} MB/s ({engine / baseline:.1f}x)")
+    if not corpus_ok or engine <= baseline:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""End-to-end throughput benchmark against a local replay of the scraped sites.
+
+Serves a corpus (the synthetic one by default, or a recording made with
+record_fixtures.py) from replay_server.ReplayServer and times each stage
+through its public entry points: the get_*_links crawlers, the
+extract_*_restaurants extractors, scrape_emails_and_platforms_from_website
+and the whole main() flow. Each benchmark reports pages/sec, rows/sec and
+peak traced memory; results are compared with a saved baseline and the
+script exits non-zero when one regresses by more than the tolerance.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --latency-ms 80 --error-rate 0.02 --save-baseline
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import newmarkets as nm  # noqa: E402
+from corpus import EATER_ORIGIN, INFATUATION_ORIGIN, load_corpus, synthetic_corpus  # noqa: E402
+from replay_server import ReplayServer  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline_pipeline.json')
+# Settings that change the numbers; a baseline only applies to runs with the same ones
+CONFIG_KEYS = ('corpus', 'latency_ms', 'jitter_ms', 'error_rate', 'throttle_rate', 'host_rate', 'max_articles', 'trace_memory')
+
+def measure(name, run, trace_memory):
+    """Run one benchmark with fresh metrics; run() returns the number of rows it produced."""
+    nm.metrics.reset()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        rows = run()
+    finally:
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+    pages = nm.metrics.counters['requests']
+    return {
+        'name': name,
+        'seconds': round(seconds, 3),
+        'pages': pages,
+        'rows': rows,
+        'pages_per_sec': round(pages / seconds, 1),
+        'rows_per_sec': round(rows / seconds, 1),
+        'peak_mb': round(peak / 2**20, 1) if trace_memory else None,
+    }
+
+def article_urls(corpus, server):
+    eater = [url for url in corpus if url.startswith(EATER_ORIGIN + '/maps/')]
+    infatuation = [url for url in corpus if url.startswith(INFATUATION_ORIGIN + '/dallas/guides/')]
+    return [server.url(url) for url in sorted(eater)], [server.url(url) for url in sorted(infatuation)]
+
+def homepage_urls(corpus, server):
+    origins = {nm._site_origin(url) for url in corpus} - {EATER_ORIGIN, INFATUATION_ORIGIN}
+    return [server.url(origin + '/') for origin in sorted(origins)]
+
+def run_benchmarks(corpus, server, args):
+    def fetcher():
+        return nm.AsyncFetcher(host_rate=args.host_rate, max_host_rate=args.host_rate * 2)
+
+    def links():
+        fetch = fetcher()
+        try:
+            eater = nm.get_eater_links(server.url(EATER_ORIGIN + '/'), args.max_articles, fetcher=fetch)
+            infatuation = nm.get_infatuation_links(server.url(INFATUATION_ORIGIN + '/dallas/guides'),
+                                                   args.max_articles, fetcher=fetch)
+        finally:
+            fetch.close()
+        return len(eater) + len(infatuation)
+
+    def extract():
+        eater, infatuation = article_urls(corpus, server)
+        fetch = fetcher()
+
+        async def extract_all():
+            processed = set()
+            batches = await asyncio.gather(
+                *(nm.extract_eater_restaurants_async(url, processed, fetcher=fetch) for url in eater),
+                *(nm.extract_infatuation_restaurants_async(url, processed, fetcher=fetch) for url in infatuation),
+            )
+            return sum(len(batch) for batch in batches)
+        try:
+            return asyncio.run(extract_all())
+        finally:
+            fetch.close()
+
+    def enrich():
+        fetch = fetcher()
+
+        async def enrich_all():
+            results = await asyncio.gather(*(
+                nm.scrape_emails_and_platforms_from_website_async(url, fetcher=fetch)
+                for url in homepage_urls(corpus, server)
+            ))
+            return sum(1 for emails, *_ in results if emails)
+        try:
+            return asyncio.run(enrich_all())
+        finally:
+            fetch.close()
+
+    def end_to_end():
+        with tempfile.TemporaryDirectory() as scratch:
+            config = os.path.join(scratch, 'markets.json')
+            with open(config, 'w') as f:
+                json.dump({'dallas': {
+                    'eater': {'city': 'dallas', 'base_url': server.url(EATER_ORIGIN)},
+                    'infatuation': {'city': 'dallas', 'base_url': server.url(INFATUATION_ORIGIN)},
+                }}, f)
+            cwd = os.getcwd()
+            os.chdir(scratch)
+            try:
+                nm.main(['--markets', 'dallas', '--markets-config', config, '--no-cache', '--no-state',
+                         '--log-level', 'WARNING'])
+                with open('restaurants.csv', newline='') as f:
+                    return sum(1 for _ in csv.DictReader(f))
+            finally:
+                os.chdir(cwd)
+
+    benchmarks = [('links', links), ('extract', extract), ('enrich', enrich), ('main', end_to_end)]
+    return [measure(name, run, args.trace_memory) for name, run in benchmarks if name in args.only]
+
+def compare(results, baseline, tolerance):
+    """Regressions against the baseline: throughput down or peak memory up by more than the tolerance."""
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        for key in ('pages_per_sec', 'rows_per_sec'):
+            if before[key] and result[key] < before[key] * (1 - tolerance):
+                regressions.append(f"{result['name']} {key} {before[key]} -> {result[key]}")
+        # Small heaps wobble by a few hundred KB between runs
+        if (before.get('peak_mb') and result['peak_mb'] and result['peak_mb'] > before['peak_mb'] * (1 + tolerance)
+                and result['peak_mb'] - before['peak_mb'] > 1):
+            regressions.append(f"{result['name']} peak_mb {before['peak_mb']} -> {result['peak_mb']}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline against a local replay of the scraped sites.')
+    parser.add_argument('--corpus', help='Recorded corpus directory (default: the synthetic corpus).')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with a 429.')
+    parser.add_argument('--host-rate', type=float, default=20.0, help='Initial requests/sec per host.')
+    parser.add_argument('--max-articles', type=int, default=20, help='Article limit for the link crawlers.')
+    parser.add_argument('--only', default='links,extract,enrich,main', help='Comma-separated benchmarks to run.')
+    parser.add_argument('--no-trace-memory', dest='trace_memory', action='store_false',
+                        help='Skip tracemalloc, which slows the run down.')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed fractional regression.')
+    args = parser.parse_args(argv)
+    args.only = set(args.only.split(','))
+    nm.setup_logging('WARNING')
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    config = {
+        'corpus': os.path.basename(os.path.normpath(args.corpus)) if args.corpus else 'synthetic',
+        'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'error_rate': args.error_rate,
+        'throttle_rate': args.throttle_rate, 'host_rate': args.host_rate, 'max_articles': args.max_articles,
+        'trace_memory': args.trace_memory,
+    }
+    with ReplayServer(corpus, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.throttle_rate) as server:
+        results = run_benchmarks(corpus, server, args)
+
+    print(f"{'benchmark':10} {'seconds':>8} {'pages':>6} {'rows':>5} {'pages/s':>8} {'rows/s':>7} {'peak MB':>8}")
+    for r in results:
+        peak = f"{r['peak_mb']:.1f}" if r['peak_mb'] is not None else '-'
+        print(f"{r['name']:10} {r['seconds']:>8.2f} {r['pages']:>6} {r['rows']:>5} "
+              f"{r['pages_per_sec']:>8.1f} {r['rows_per_sec']:>7.1f} {peak:>8}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if any(baseline['config'].get(key) != config[key] for key in CONFIG_KEYS):
+        print(f"Baseline {args.baseline} was recorded with other settings ({baseline['config']}); not comparing.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Micro-benchmark: single-pass SignatureMatcher vs one regex search per signature.
+
+Generates synthetic vendor registries of increasing size and times both
+approaches over the same restaurant-homepage-sized documents.
+
+    python benchmarks/bench_signatures.py
+"""
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newmarkets import SignatureMatcher, load_signature_matcher  # noqa: E402
+
+def random_domain(rng):
+    name = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+    return f"{name}.{rng.choice(['com', 'io', 'co', 'app'])}"
+
+def synthetic_signatures(count, rng):
+    signatures = {'pos': {}, 'ordering': {}, 'reservation': {}}
+    categories = list(signatures)
+    for i in range(count):
+        signatures[categories[i % 3]][f'Vendor {i}'] = [random_domain(rng)]
+    return signatures
+
+def synthetic_document(signatures, size, rng):
+    needles = [needle for platforms in signatures.values() for needles in platforms.values() for needle in needles]
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(500)]
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.002:
+            part = f'<a href="https://{rng.choice(needles)}/r/x">'
+        else:
+            part = rng.choice(words)
+        parts.append(part)
+        length += len(part) + 1
+    return ' '.join(parts)
+
+def naive_search(patterns, text):
+    return {key for key, pattern in patterns.items() if pattern.search(text)}
+
+def bench(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    rng = random.Random(0)
+    repeat = 5
+    print(f"{'signatures':>10} {'doc KB':>7} {'per-regex ms':>13} {'single-pass ms':>15} {'speedup':>8}")
+    shipped = sum(len(platforms) for platforms in load_signature_matcher().signatures.values())
+    registry_sizes = [shipped, 100, 200, 400, 800]
+    for count in registry_sizes:
+        signatures = synthetic_signatures(count, rng)
+        document = synthetic_document(signatures, 200_000, rng)
+        matcher = SignatureMatcher(signatures)
+        patterns = {
+            (category, name): re.compile('|'.join(re.escape(needle) for needle in needles))
+            for category, platforms in signatures.items()
+            for name, needles in platforms.items()
+        }
+        assert matcher.search(document) == naive_search(patterns, document)
+        naive = bench(lambda: naive_search(patterns, document), repeat)
+        single = bench(lambda: matcher.search(document), repeat)
+        print(f"{count:>10} {len(document) // 1024:>7} {naive * 1000:>13.2f} {single * 1000:>15.2f} {naive / single:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
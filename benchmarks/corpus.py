@@ -0,0 +1,207 @@
+"""Page corpora for the offline pipeline benchmark.
+
+A corpus maps original URLs (https://dallas.eater.com/maps/...) to a
+recorded response: {'status', 'content_type', 'body'}, plus 'location' for
+redirects. On disk it is a directory holding manifest.json plus one file per
+body, the layout written by record_fixtures.py and read back by load_corpus().
+
+synthetic_corpus() builds a deterministic stand-in with the same markup the
+extractors read (Eater mapstack cards, Infatuation venue cards, the JSON-LD
+and __NEXT_DATA__ payloads most articles embed, restaurant homepages with
+contact/about pages), for machines without a recording.
+"""
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+EATER_ORIGIN = 'https://dallas.eater.com'
+INFATUATION_ORIGIN = 'https://www.theinfatuation.com'
+HTML = 'text/html; charset=utf-8'
+
+WORDS = (
+    'smoked brisket tacos patio natural wine omakase counter seasonal menu chef tasting neighborhood '
+    'brunch cocktails late night happy hour barbecue sandwiches noodles dumplings pastry coffee '
+    'oysters burgers pizza bakery tortillas mole margaritas queso ribs sausage kolaches'
+).split()
+PLATFORM_SNIPPETS = (
+    '<script src="https://cdn.toasttab.com/web/v1/online-ordering.js"></script>',
+    '<a href="https://resy.com/cities/dal/venue-{i}">Reserve a table</a>',
+    '<a href="https://www.opentable.com/r/venue-{i}-dallas">Book on OpenTable</a>',
+    '<a href="https://order.toasttab.com/online/venue-{i}">Order online</a>',
+    '<script src="https://js.squareup.com/v2/paymentform"></script>',
+)
+
+def _filler(rng, paragraphs):
+    # Navigation, prose and inline script roughly the size of real pages
+    parts = ['<nav>' + ''.join(f'<a href="/section/{w}">{w.title()}</a>' for w in rng.sample(WORDS, 10)) + '</nav>']
+    for _ in range(paragraphs):
+        parts.append('<p>' + ' '.join(rng.choice(WORDS) for _ in range(60)) + '</p>')
+    parts.append('<script>window.__DATA__ = {"items": [' + ','.join(str(rng.random()) for _ in range(200)) + ']};</script>')
+    return ''.join(parts)
+
+def _restaurant(rng, i):
+    name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}"
+    return {
+        'name': name,
+        'address': f"{100 + i} {rng.choice(['Elm', 'Main', 'Commerce', 'Greenville', 'Lower Greenville'])} "
+                   f"{rng.choice(['St', 'Ave', 'Street', 'Avenue'])}, Dallas, TX 752{i % 100:02d}",
+        'phone': f"(214) 555-{i:04d}",
+        'website': f"https://www.venue{i}.com/",
+    }
+
+def _site_pages(rng, i, restaurant):
+    origin = restaurant['website'].rstrip('/')
+    kind = i % 5
+    platform = PLATFORM_SNIPPETS[i % len(PLATFORM_SNIPPETS)].format(i=i)
+    footer = '<footer><a href="/contact-us">Contact</a> <a href="/private-events">Private Events</a></footer>'
+    nav = '<a href="/menu">Menu</a><a href="/gallery">Gallery</a><a href="/about">Our Story</a>'
+    home_email = f'<p>Questions? hello@venue{i}.com</p>' if kind in (0, 1) else ''
+    pages = {
+        origin + '/': f"<html><head><title>{restaurant['name']}</title></head><body>{nav}"
+                      f"<h1>{restaurant['name']}</h1>{home_email}{platform if kind != 2 else ''}"
+                      f"{_filler(rng, 20)}{footer}</body></html>",
+        origin + '/menu': f"<html><body>{nav}{_filler(rng, 30)}</body></html>",
+        origin + '/gallery': f"<html><body>{nav}{_filler(rng, 5)}</body></html>",
+        origin + '/about': f"<html><body>{nav}<p>Our story.</p>{platform if kind == 2 else ''}{_filler(rng, 10)}</body></html>",
+        origin + '/contact-us': f'<html><body>{nav}<p>Reach us at <a href="mailto:info@venue{i}.com">info@venue{i}.com</a>'
+                                f' or events [at] venue{i} [dot] com</p>{_filler(rng, 3)}{footer}</body></html>',
+        origin + '/private-events': f"<html><body><p>Book the back room: events@venue{i}.com</p>{_filler(rng, 3)}</body></html>",
+    }
+    if kind == 4:
+        # Some sites only expose their email behind a contact form
+        pages[origin + '/contact-us'] = f"<html><body><form></form>{_filler(rng, 3)}</body></html>"
+    return pages
+
+def _eater_card(restaurant):
+    return (
+        f'<section class="c-mapstack__card"><h1>{restaurant["name"]}</h1>'
+        f'<div class="c-mapstack__address">{restaurant["address"]}</div>'
+        f'<div class="c-mapstack__phone">{restaurant["phone"]}</div>'
+        f'<a data-analytics-link="link-icon" href="{restaurant["website"]}">Visit Website</a>'
+        f'<p>{restaurant["name"]} is known for its {restaurant["name"].split()[0].lower()}.</p></section>'
+    )
+
+def _infatuation_card(restaurant):
+    return (
+        f'<div class="styles_venueCard__Xq1"><h2>{restaurant["name"]}</h2>'
+        f'<a data-testid="venue-googleMapUrl" href="https://maps.google.com/?q={restaurant["phone"]}">{restaurant["address"]}</a>'
+        f'<a data-testid="venue-phoneNumber" href="tel:{restaurant["phone"]}">{restaurant["phone"]}</a>'
+        f'<a data-testid="venue-url" href="{restaurant["website"]}">Website</a></div>'
+    )
+
+def _coordinates(i):
+    return round(32.70 + (i % 17) * 0.01, 5), round(-96.80 - (i % 13) * 0.01, 5)
+
+def _json_ld(restaurants):
+    # schema.org ItemList of Restaurants, as map pages embed it
+    items = []
+    for position, restaurant in enumerate(restaurants, 1):
+        i = int(restaurant['name'].rsplit(' ', 1)[1])
+        street, city, region = restaurant['address'].split(', ')
+        state, postal = region.split()
+        latitude, longitude = _coordinates(i)
+        items.append({'@type': 'ListItem', 'position': position, 'item': {
+            '@type': 'Restaurant', 'name': restaurant['name'], 'telephone': restaurant['phone'], 'url': restaurant['website'],
+            'address': {'@type': 'PostalAddress', 'streetAddress': street, 'addressLocality': city,
+                        'addressRegion': state, 'postalCode': postal},
+            'geo': {'@type': 'GeoCoordinates', 'latitude': latitude, 'longitude': longitude},
+            'servesCuisine': [WORDS[i % len(WORDS)].title()],
+        }})
+    data = {'@context': 'https://schema.org', '@type': 'ItemList', 'itemListElement': items}
+    return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+def _next_data(restaurants):
+    # Next.js page props with the guide's venues, as guide pages embed them
+    venues = []
+    for restaurant in restaurants:
+        i = int(restaurant['name'].rsplit(' ', 1)[1])
+        street, city, region = restaurant['address'].split(', ')
+        state, postal = region.split()
+        latitude, longitude = _coordinates(i)
+        venues.append({
+            'name': restaurant['name'], 'street': street, 'city': city, 'state': state, 'zip': postal,
+            'phone': restaurant['phone'], 'website': restaurant['website'], 'lat': latitude, 'lng': longitude,
+            'cuisines': [{'name': WORDS[i % len(WORDS)].title()}], 'neighborhood': {'name': 'Deep Ellum'},
+        })
+    data = {'props': {'pageProps': {'guide': {'title': 'Guide', 'venues': venues}}}, 'page': '/[city]/guides/[slug]'}
+    return f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+
+def _byline(date):
+    return f'<time class="c-byline__item" data-ui="timestamp" datetime="{date.isoformat(timespec="seconds")}">{date:%b %d, %Y}</time>'
+
+def synthetic_corpus(seed=0, maps=12, old_maps=3, cards_per_map=20, guides=10, cards_per_guide=15, sites=80):
+    """Build a deterministic corpus of Eater maps, Infatuation guides and restaurant sites."""
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    restaurants = [_restaurant(rng, i) for i in range(sites)]
+    pages = {}
+
+    for i, restaurant in enumerate(restaurants):
+        pages.update(_site_pages(rng, i, restaurant))
+
+    map_links = []
+    for m in range(maps + old_maps):
+        old = m >= maps
+        url = f'{EATER_ORIGIN}/maps/best-{rng.choice(WORDS)}-dallas-{m}'
+        map_links.append(url)
+        date = now - timedelta(days=900 + m) if old else now - timedelta(days=7 * m + 1)
+        cards = rng.sample(restaurants, cards_per_map)
+        related = ''.join(f'<a href="{link}">More maps</a>' for link in map_links[-3:-1])
+        # Every third map has no structured data, leaving the DOM extractor to it
+        structured = _json_ld(cards) if m % 3 != 2 else ''
+        pages[url] = (
+            f'<html><head><meta property="article:published_time" content="{date.isoformat()}">{structured}</head><body>'
+            f'{_filler(rng, 10)}{_byline(date)}'
+            f'<section class="c-mapstack__card"><h1>The Best {rng.choice(WORDS).title()} in Dallas</h1></section>'
+            + ''.join(_eater_card(r) for r in cards) + related + _filler(rng, 40) + '</body></html>'
+        )
+    dated = [f'{EATER_ORIGIN}/{(now - timedelta(days=30 * k)).year}/{(now - timedelta(days=30 * k)).month}/1/{k}/news-{k}'
+             for k in range(6)]
+    for k, url in enumerate(dated):
+        date = now - timedelta(days=30 * k)
+        pages[url] = (f'<html><body>{_byline(date)}<p>News.</p>'
+                      f'<a href="{map_links[k % len(map_links)]}">Map</a>{_filler(rng, 15)}</body></html>')
+    pages[EATER_ORIGIN + '/'] = (
+        '<html><body>' + ''.join(f'<a href="{link}">Map</a>' for link in map_links + dated)
+        + _filler(rng, 30) + '</body></html>'
+    )
+
+    guide_index = f'{INFATUATION_ORIGIN}/dallas/guides'
+    guide_links = [f'{guide_index}/{rng.choice(WORDS)}-guide-{g}' for g in range(guides)]
+    for g, url in enumerate(guide_links):
+        date = now - timedelta(days=10 * g + 2)
+        cards = rng.sample(restaurants, cards_per_guide)
+        pages[url] = (
+            f'<html><body><time datetime="{date.isoformat(timespec="seconds")}">{date:%B %d, %Y}</time>'
+            + ''.join(_infatuation_card(r) for r in cards)
+            + _filler(rng, 20) + (_next_data(cards) if g % 3 != 2 else '') + '</body></html>'
+        )
+    pages[guide_index] = '<html><body>' + ''.join(f'<a href="{link}">Guide</a>' for link in guide_links) + '</body></html>'
+
+    return {url: {'status': 200, 'content_type': HTML, 'body': body.encode()} for url, body in pages.items()}
+
+def save_corpus(corpus, directory):
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    for url, response in corpus.items():
+        filename = hashlib.sha1(url.encode()).hexdigest()[:16] + '.html'
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(response['body'])
+        manifest[url] = {'file': filename, 'status': response['status'], 'content_type': response['content_type']}
+        if response.get('location'):
+            manifest[url]['location'] = response['location']
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def load_corpus(directory):
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        manifest = json.load(f)
+    corpus = {}
+    for url, entry in manifest.items():
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            corpus[url] = {'status': entry['status'], 'content_type': entry['content_type'], 'body': f.read()}
+        if 'location' in entry:
+            corpus[url]['location'] = entry['location']
+    return corpus
@@ -0,0 +1,69 @@
+"""Record a live corpus for bench_pipeline.py and replay_server.py.
+
+Runs the normal pipeline for one market against the live sites with a
+session that keeps every successful response, then writes them in the
+corpus layout (manifest.json plus one file per page). Caching, crawl state
+and early aborts are off so every page the benchmark needs is fetched whole.
+
+    python benchmarks/record_fixtures.py --market dallas --out benchmarks/fixtures/dallas
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from urllib.parse import urljoin
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import newmarkets as nm  # noqa: E402
+from corpus import save_corpus  # noqa: E402
+
+def recording_session(corpus):
+    session = nm.create_session()
+
+    def record(response, *args, **kwargs):
+        if response.is_redirect:
+            # Each hop passes through here, so the redirect and its target are both kept
+            corpus[response.url] = {
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type', 'text/html'),
+                'body': b'',
+                'location': urljoin(response.url, response.headers['Location']),
+            }
+        elif response.status_code == 200:
+            # Reading the body here still lets streaming callers iterate it
+            corpus[response.url] = {
+                'status': 200,
+                'content_type': response.headers.get('Content-Type', 'text/html'),
+                'body': response.content,
+            }
+    session.hooks['response'].append(record)
+    return session
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record live pages into a benchmark corpus.')
+    parser.add_argument('--market', default=nm.DEFAULT_MARKET)
+    parser.add_argument('--markets-config', default=nm.MARKETS_PATH)
+    parser.add_argument('--max-articles', type=int, default=5)
+    parser.add_argument('--max-websites', type=int, default=50)
+    parser.add_argument('--out', required=True, help='Directory to write the corpus to.')
+    args = parser.parse_args(argv)
+    nm.setup_logging('INFO')
+
+    corpus = {}
+    fetcher = nm.AsyncFetcher(session=recording_session(corpus))
+    sources = nm.market_sources(args.market, args.markets_config)
+    with tempfile.TemporaryDirectory() as scratch:
+        sink = nm.CsvSink(os.path.join(scratch, 'restaurants.csv'), os.path.join(scratch, 'hubspot.csv'))
+        try:
+            asyncio.run(nm.run_pipeline(fetcher, sink=sink, max_articles=args.max_articles,
+                                        max_websites=args.max_websites, sources=sources))
+        finally:
+            fetcher.close()
+    save_corpus(corpus, args.out)
+    print(f"Recorded {len(corpus)} pages to {args.out}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Local stand-in for Eater, The Infatuation and restaurant sites.
+
+ReplayServer serves a corpus (see corpus.py) over plain HTTP. Every original
+origin gets its own loopback address (127.0.0.2, 127.0.0.3, ...) on one
+shared port, so per-host concurrency and rate limits behave as they do
+against the real sites, and links inside the pages are rewritten to point
+at those addresses. Latency, jitter and injected 503/429 responses are
+configurable and seeded, so runs are comparable.
+
+    python benchmarks/replay_server.py --latency-ms 80 --error-rate 0.02
+"""
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        replay = self.server.replay
+        origin = self.server.origin
+        delay, fault = replay.plan()
+        if delay:
+            time.sleep(delay)
+        if fault == 503:
+            return self._send(503, b'Service Unavailable', 'text/plain')
+        if fault == 429:
+            return self._send(429, b'Too Many Requests', 'text/plain', {'Retry-After': '0'})
+        response = replay.corpus.get(origin + self.path)
+        if response is None:
+            return self._send(404, b'Not Found', 'text/plain')
+        replay.count(origin)
+        headers = {}
+        if response.get('location'):
+            headers['Location'] = replay.rewrite(response['location'].encode()).decode()
+        self._send(response['status'], replay.rewrite(response['body']), response['content_type'], headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ReplayHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop pooled keep-alive connections when they finish
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+class ReplayServer:
+    """Serve a corpus on loopback addresses, one per original origin."""
+
+    def __init__(self, corpus, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, seed=0, port=0):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.port = port
+        self.origins = sorted({'{0.scheme}://{0.netloc}'.format(urlsplit(url)) for url in corpus})
+        if len(self.origins) > 250:
+            raise ValueError(f"{len(self.origins)} origins do not fit on 127.0.0.0/24")
+        self.local = {}
+        self.served = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._servers = []
+        self._pattern = None
+        self._local_bytes = {}
+
+    def plan(self):
+        """Delay and injected fault (None, 503 or 429) for the next request."""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        if roll < self.error_rate:
+            return delay, 503
+        if roll < self.error_rate + self.throttle_rate:
+            return delay, 429
+        return delay, None
+
+    def count(self, origin):
+        with self._lock:
+            self.served[origin] = self.served.get(origin, 0) + 1
+
+    def rewrite(self, body):
+        return self._pattern.sub(lambda match: self._local_bytes[match.group(0)], body)
+
+    def url(self, original_url):
+        """The replay server's address for an URL from the corpus."""
+        parts = urlsplit(original_url)
+        return self.local['{0.scheme}://{0.netloc}'.format(parts)] + original_url[len(parts.scheme) + 3 + len(parts.netloc):]
+
+    def start(self):
+        # Bind the first address on a free port, then reuse that port for the rest
+        for i, origin in enumerate(self.origins):
+            host = f'127.0.0.{2 + i}'
+            server = ReplayHTTPServer((host, self.port), ReplayHandler)
+            server.replay = self
+            server.origin = origin
+            self.port = server.server_address[1]
+            self.local[origin] = f'http://{host}:{self.port}'
+            self._servers.append(server)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._local_bytes = {origin.encode(): local.encode() for origin, local in self.local.items()}
+        # Only whole origins: not https://www.venue1.com inside https://www.venue1.com.au
+        alternatives = sorted(self._local_bytes, key=len, reverse=True)
+        self._pattern = re.compile(b'|'.join(re.escape(origin) + rb'(?![\w.-])' for origin in alternatives))
+        return self
+
+    def stop(self):
+        # Each shutdown() waits out its server's poll interval, so stop them all at once
+        threads = [threading.Thread(target=server.shutdown) for server in self._servers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for server in self._servers:
+            server.server_close()
+        self._servers.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main(argv=None):
+    from corpus import load_corpus, synthetic_corpus
+
+    parser = argparse.ArgumentParser(description='Replay a recorded corpus on local addresses.')
+    parser.add_argument('--corpus', help='Directory written by record_fixtures.py (default: the synthetic corpus).')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    args = parser.parse_args(argv)
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    server = ReplayServer(corpus, args.latency_ms / 1000, args.jitter_ms / 1000,
+                          args.error_rate, args.throttle_rate, port=args.port)
+    with server:
+        for origin, local in server.local.items():
+            print(f"{origin:40} {local}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    sys.exit(main())
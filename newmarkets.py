@@ -1,10 +1,307 @@
+import argparse
+import asyncio
+import calendar
+import codecs
+import csv
+import functools
+import hashlib
+import heapq
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import unicodedata
+import urllib.robotparser
+import zlib
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag
 import re
-from urllib.parse import urljoin, urlparse, urldefrag
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+from xml.etree.ElementTree import ParseError, XMLPullParser
+from urllib.parse import unquote, urljoin, urlparse, urldefrag
 import time
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+
+logger = logging.getLogger('newmarkets')
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_STANDARD_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any `extra` fields and the log context."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class LogContext(logging.Filter):
+    """Stamp every record with run-wide fields such as the market being scraped."""
+
+    fields = {}
+
+    def filter(self, record):
+        for key, value in self.fields.items():
+            setattr(record, key, value)
+        return True
+
+def setup_logging(level='INFO', log_format='text'):
+    handler = logging.StreamHandler()
+    handler.addFilter(LogContext())
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter('%(message)s'))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+class Metrics:
+    """Run-wide instrumentation: stage timers, counters and per-host latency histograms.
+
+    Stage times are busy time summed over concurrent work, so they can add up
+    to more than the wall-clock time. Updates are locked because fetches run
+    on worker threads.
+    """
+
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.stages = {}  # stage -> [calls, seconds]
+            self.counters = Counter()
+            self.host_latency = {}  # host -> [count per bucket]
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def observe_latency(self, host, seconds):
+        with self._lock:
+            buckets = self.host_latency.setdefault(host, [0] * len(self.LATENCY_BUCKETS))
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+                    break
+
+    def latency_percentile(self, host, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of a host's requests."""
+        buckets = self.host_latency[host]
+        target = fraction * sum(buckets)
+        seen = 0
+        for bound, count in zip(self.LATENCY_BUCKETS, buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.LATENCY_BUCKETS[-1]
+
+    def snapshot(self, cache=None):
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {stage: {'calls': calls, 'seconds': round(seconds, 3)} for stage, (calls, seconds) in self.stages.items()}
+            hosts = {host: list(buckets) for host, buckets in self.host_latency.items()}
+        if cache is not None:
+            counters.update(cache_hits=cache.hits, cache_misses=cache.misses, cache_revalidated=cache.revalidated)
+        lookups = counters.get('cache_hits', 0) + counters.get('cache_misses', 0) + counters.get('cache_revalidated', 0)
+        articles = counters.get('articles_extracted', 0)
+        sites = counters.get('sites_enriched', 0)
+        return {
+            'wall_seconds': round(time.monotonic() - self.started, 3),
+            'stages': stages,
+            'counters': counters,
+            'cache_hit_rate': round((counters.get('cache_hits', 0) + counters.get('cache_revalidated', 0)) / lookups, 3) if lookups else None,
+            'restaurants_per_article': round(counters.get('restaurants_extracted', 0) / articles, 2) if articles else None,
+            'emails_per_site': round(counters.get('emails_found', 0) / sites, 2) if sites else None,
+            'latency_buckets': [str(bound) for bound in self.LATENCY_BUCKETS],
+            'host_latency': hosts,
+        }
+
+    def report(self, cache=None, slowest_hosts=5):
+        """Log an end-of-run summary of where the time went, and return it as a dict."""
+        summary = self.snapshot(cache)
+        counters = summary['counters']
+        logger.info("Run summary: %.1fs wall clock", summary['wall_seconds'], extra={'metrics': summary})
+        for stage, totals in sorted(summary['stages'].items(), key=lambda item: -item[1]['seconds']):
+            logger.info("  %-10s %8.2fs busy over %d calls", stage, totals['seconds'], totals['calls'])
+        logger.info(
+            "  %d requests, %.1f MB downloaded, %d retries, %d throttled, %d downloads aborted early",
+            counters.get('requests', 0), counters.get('bytes_downloaded', 0) / 1e6, counters.get('retries', 0),
+            counters.get('throttled', 0), counters.get('aborted_downloads', 0),
+        )
+        if summary['cache_hit_rate'] is not None:
+            logger.info("  cache hit rate %.0f%% (%d hits, %d revalidated, %d misses)", 100 * summary['cache_hit_rate'],
+                        counters.get('cache_hits', 0), counters.get('cache_revalidated', 0), counters.get('cache_misses', 0))
+        logger.info(
+            "  %d restaurants from %d articles (%s per article); %d emails from %d sites (%s per site)",
+            counters.get('restaurants_extracted', 0), counters.get('articles_extracted', 0), summary['restaurants_per_article'],
+            counters.get('emails_found', 0), counters.get('sites_enriched', 0), summary['emails_per_site'],
+        )
+        hosts = sorted(summary['host_latency'], key=lambda host: (-self.latency_percentile(host, 0.95), host))
+        for host in hosts[:slowest_hosts]:
+            logger.info("  %s: %d requests, p50 <= %ss, p95 <= %ss", host, sum(summary['host_latency'][host]),
+                        self.latency_percentile(host, 0.5), self.latency_percentile(host, 0.95))
+        return summary
+
+metrics = Metrics()
+
+try:
+    import lxml  # noqa: F401  (optional fast parser backend)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+try:
+    import pyarrow.parquet  # optional, for --parquet exports
+except ImportError:
+    pyarrow = None
+
+# Strainers limit each parse to the elements an extractor actually reads
+CRAWL_STRAINER = SoupStrainer(['a', 'time'])
+EATER_ARTICLE_STRAINER = SoupStrainer(['section', 'time'])
+INFATUATION_ARTICLE_STRAINER = SoupStrainer(['div', 'time'])
+
+ParsedPage = namedtuple('ParsedPage', ['soup', 'text', 'hrefs', 'anchors', 'time_tags'])
+
+def parse_page(content, parse_only=None):
+    """Parse a page once and collect its text, anchors (and their hrefs) and <time> tags in a single traversal.
+
+    `text` matches soup.get_text(): only plain text and CDATA nodes are kept,
+    so script, style and comment contents are skipped.
+    """
+    with metrics.timer('parse'):
+        return _parse_page(content, parse_only)
+
+def _parse_page(content, parse_only):
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=parse_only)
+    strings = []
+    hrefs = []
+    anchors = []
+    time_tags = []
+    for element in soup.descendants:
+        if isinstance(element, Tag):
+            if element.name == 'a':
+                href = element.get('href')
+                if href is not None:
+                    hrefs.append(href)
+                    anchors.append(element)
+            elif element.name == 'time':
+                time_tags.append(element)
+        elif type(element) is NavigableString or type(element) is CData:
+            strings.append(element)
+    return ParsedPage(soup, ''.join(strings), hrefs, anchors, time_tags)
+
+SIGNATURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'platform_signatures.json')
+
+PLATFORM_LABELS = {
+    'pos': 'POS system',
+    'ordering': 'ordering platform',
+    'reservation': 'reservation platform',
+}
+
+def _trie_pattern(needles):
+    """Build a regex that matches the longest of `needles` at a position, branching on shared prefixes."""
+    trie = {}
+    for needle in needles:
+        node = trie
+        for char in needle:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+class SignatureMatcher:
+    """Detect POS, ordering and reservation vendors in a single pass over a document.
+
+    Needles are matched from their end: the document is reversed once and
+    the reversed needles are grouped by their first three characters (for
+    domains, the reversed TLD). Each group becomes one trie-shaped regex
+    that starts with a literal, which the regex engine can scan for
+    quickly, so the cost of a scan depends on the number of distinct
+    endings rather than on the number of vendors. A match also counts
+    every shorter needle it contains, so a vendor nested inside another
+    vendor's needle (toasttab.com in order.toasttab.com) is still reported.
+    """
+
+    def __init__(self, signatures):
+        self.signatures = signatures
+        needle_owners = {}
+        for category, platforms in signatures.items():
+            for name, needles in platforms.items():
+                for needle in needles:
+                    needle_owners.setdefault(needle, set()).add((category, name))
+        # A longer needle implies every needle it contains
+        self._owners = {
+            needle[::-1]: set().union(*(needle_owners[other] for other in needle_owners if other in needle))
+            for needle in needle_owners
+        }
+        groups = {}
+        for reversed_needle in self._owners:
+            groups.setdefault(reversed_needle[:3], []).append(reversed_needle)
+        self._patterns = [re.compile(_trie_pattern(needles)) for needles in groups.values()]
+        self._total = sum(len(platforms) for platforms in signatures.values())
+
+    def search(self, text):
+        """Return the set of (category, platform name) pairs found in text."""
+        found = set()
+        reversed_text = text[::-1]
+        for pattern in self._patterns:
+            for match in pattern.finditer(reversed_text):
+                found |= self._owners[match.group()]
+            if len(found) == self._total:
+                break
+        return found
+
+@functools.lru_cache(maxsize=None)
+def load_signature_matcher(path=SIGNATURES_PATH):
+    """Load the platform signature registry once and compile its matcher."""
+    with open(path) as f:
+        return SignatureMatcher(json.load(f))
 
 def normalize_url(url):
     """Normalize URL by removing fragments and trailing slashes, and converting to lowercase."""
@@ -13,98 +310,1146 @@ def normalize_url(url):
     url = url.lower()        # Convert to lowercase
     return url
 
-def get_eater_links(start_url, max_articles=5):  # Limit to 5 articles for testing
-    print(f"Starting to crawl Eater URLs from {start_url}")
-    visited = set()
-    to_visit = [start_url]
-    eater_urls = []
-    cutoff_date = datetime.now() - timedelta(days=547.5)  # Approximately 1.5 years
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+REQUEST_TIMEOUT = (5, 10)  # (connect, read) seconds
+# 429s are not retried by the session: AsyncFetcher slows the host down and retries them itself
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+class SessionRetry(Retry):
+    """urllib3 retry policy that leaves 429s to AsyncFetcher and caps Retry-After waits.
+
+    Retry honours Retry-After on 429s even when they are not in the status
+    forcelist, sleeping on an executor thread for as long as the header asks.
+    """
+
+    RETRY_AFTER_STATUS_CODES = frozenset({413, 503})
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+def create_session(pool_connections=32, pool_maxsize=4, retries=3, backoff_factor=0.5):
+    """Create the pooled HTTP session shared by every fetch.
+
+    Connections are kept alive and pooled per host, so repeated hits to the
+    same site reuse their TLS connection. Connection errors, resets and 5xx
+    responses are retried with jittered exponential backoff, honouring
+    Retry-After up to MAX_RETRY_AFTER. Once retries are exhausted the last
+    response is returned.
+    """
+    retry = SessionRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in offline mode when a URL is not in the response cache."""
+
+class ResponseCache:
+    """Persistent SQLite cache of HTTP responses, keyed on the normalized URL.
+
+    Entries younger than their TTL are served without touching the network.
+    Stale entries are revalidated with If-None-Match / If-Modified-Since and
+    a 304 simply refreshes them. The cache is bounded by `max_bytes` and
+    evicts the least recently used entries first.
+    """
+
+    def __init__(self, path='.cache/http_cache.sqlite', default_ttl=24 * 3600, host_ttls=None, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.host_ttls = host_ttls or {}
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._db.commit()
+
+    def ttl_for(self, url):
+        return self.host_ttls.get(urlparse(url).netloc.lower(), self.default_ttl)
+
+    def is_fresh(self, entry, url):
+        return time.time() - entry['fetched_at'] < self.ttl_for(url)
+
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT url, status, headers, content, etag, last_modified, fetched_at FROM responses WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+        return {
+            'url': row[0],
+            'status': row[1],
+            'headers': json.loads(row[2]),
+            'content': row[3],
+            'etag': row[4],
+            'last_modified': row[5],
+            'fetched_at': row[6],
+        }
+
+    def store(self, url, response):
+        headers = dict(response.headers)
+        content = response.content
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    normalize_url(url), response.url or url, response.status_code, json.dumps(headers), content,
+                    response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now, len(content),
+                ),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url):
+        """Mark a cached entry as freshly validated after a 304."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'UPDATE responses SET fetched_at = ?, last_access = ? WHERE key = ?', (now, now, normalize_url(url))
+            )
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
 
-    while to_visit:
-        if len(eater_urls) >= max_articles:
-            print(f"Reached the maximum number of articles ({max_articles}). Stopping crawl.")
-            break
-        url = to_visit.pop()
-        url_normalized = normalize_url(url)
-        print(f"Processing URL: {url}")
-        if url_normalized in visited:
-            print(f"Skipping URL (already visited): {url}")
-            continue
-        visited.add(url_normalized)
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def cached_response(entry):
+    """Build a requests.Response from a cache entry."""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.reason = 'OK'
+    response.url = entry['url']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = entry['content']
+    return response
+
+class RobotsDisallowed(requests.RequestException):
+    """Raised when robots.txt does not allow fetching a URL."""
+
+# Adaptive per-host rate limits (requests per second)
+INITIAL_HOST_RATE = 2.0
+MAX_HOST_RATE = 8.0
+MIN_HOST_RATE = 0.1
+HOST_RATE_INCREASE = 0.25  # Added after each fast response
+HOST_RATE_BACKOFF = 0.5  # Rate multiplier after a 429
+SLOW_RESPONSE_SECONDS = 3.0
+SLOW_RESPONSE_BACKOFF = 0.75  # Rate multiplier after a slow response
+MAX_RETRY_AFTER = 60  # Longer Retry-After values give up on the request instead of waiting
+THROTTLE_RETRIES = 3
+ABORT_CHUNK_SIZE = 16 * 1024  # Chunk size for downloads that may be cut short
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class HostRateLimiter:
+    """Token bucket for one host whose rate adapts to how the host responds.
+
+    The rate grows additively while responses come back quickly and is cut
+    multiplicatively on slow responses and 429s (AIMD); a Retry-After header
+    also blocks the host until it has passed. A robots.txt Crawl-delay caps
+    the rate for good.
+    """
+
+    def __init__(self, rate=INITIAL_HOST_RATE, max_rate=MAX_HOST_RATE, capacity=2):
+        self.max_rate = max_rate
+        self.rate = min(rate, max_rate)
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+
+    def set_crawl_delay(self, delay):
+        self.max_rate = min(self.max_rate, 1 / delay)
+        self.rate = min(self.rate, self.max_rate)
+        self.capacity = 1
+        self.tokens = min(self.tokens, 1)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return
+            else:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def record_response(self, latency):
+        if latency > SLOW_RESPONSE_SECONDS:
+            self.rate = max(MIN_HOST_RATE, self.rate * SLOW_RESPONSE_BACKOFF)
+        else:
+            self.rate = min(self.max_rate, self.rate + HOST_RATE_INCREASE)
+
+    def record_throttle(self, retry_after=None):
+        self.throttled += 1
+        self.rate = max(MIN_HOST_RATE, self.rate * HOST_RATE_BACKOFF)
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0
+        # Longer Retry-After values abandon the request (see AsyncFetcher._send), not the host
+        wait = min(retry_after, MAX_RETRY_AFTER) if retry_after is not None else 1 / self.rate
+        self.blocked_until = max(self.blocked_until, now + wait)
+
+class AsyncFetcher:
+    """Shared asyncio fetch layer used by every crawl, extraction and enrichment stage.
+
+    Requests go through one pooled session (see create_session) and run on a
+    thread pool so the blocking HTTP client can be awaited. With a
+    ResponseCache, fresh entries are served before any limit is taken and
+    `offline=True` serves only from the cache.
+    A global semaphore caps the total number of requests in flight. Each host
+    gets its own semaphore and an adaptive HostRateLimiter, and its robots.txt
+    is read before the first request (disallowed URLs raise RobotsDisallowed
+    and Crawl-delay caps the host's rate). 429s slow the host down and are
+    retried here, so throughput is bounded by what each host tolerates.
+    """
+
+    def __init__(self, max_concurrency=16, per_host_limit=2, host_rate=INITIAL_HOST_RATE, max_host_rate=MAX_HOST_RATE,
+                 session=None, timeout=REQUEST_TIMEOUT, cache=None, offline=False, respect_robots=True):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.host_rate = host_rate
+        self.max_host_rate = max_host_rate
+        self.respect_robots = respect_robots
+        self.session = session or create_session(pool_maxsize=per_host_limit)
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._loop = None
+        self._global_semaphore = None
+        self._host_semaphores = {}
+        self._host_locks = {}
+        self.limiters = {}
+        self._robots = {}
+        self.aborted = 0  # Downloads cut short by an abort_if check
+
+    def _bind_loop(self):
+        # Semaphores belong to an event loop, so rebuild them if the fetcher
+        # is reused from a new asyncio.run() call.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_semaphores = {}
+            self._host_locks = {}
+        return loop
+
+    def _load_robots(self, origin):
+        # Missing or unreadable robots.txt files allow everything
+        robots = urllib.robotparser.RobotFileParser(origin + '/robots.txt')
+        entry = self.cache.get(robots.url) if self.cache is not None else None
         try:
-            response = requests.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Extract publication date
-            time_tag = soup.find('time', class_='c-byline__item', attrs={'data-ui': 'timestamp'})
-            if time_tag and 'datetime' in time_tag.attrs:
-                article_date_str = time_tag['datetime']
-                try:
-                    article_date = datetime.fromisoformat(article_date_str)
-                    if article_date < cutoff_date:
-                        print(f"Article is older than 1.5 years: {article_date}")
-                        continue  # Skip this article
-                except ValueError:
-                    print(f"Invalid date format in article: {article_date_str}")
-                    continue
-
-            # Find all links that start with the desired prefixes
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if 'tel:' in href:
-                    print(f"Skipping telephone link: {href}")
-                    continue  # Skip links with 'tel:'
-                full_url = urljoin(url, href)
-                full_url_normalized = normalize_url(full_url)
-                if (
-                    full_url_normalized.startswith('https://dallas.eater.com/2023') or
-                    full_url_normalized.startswith('https://dallas.eater.com/2024') or
-                    full_url_normalized.startswith('https://dallas.eater.com/maps')
-                ):
-                    if full_url_normalized not in visited and full_url_normalized not in to_visit:
-                        to_visit.append(full_url)
-                        print(f"Found new URL to visit: {full_url}")
-
-            # Collect URLs that contain restaurant data (heuristic)
-            if ('/maps/' in url or '/article/' in url) and url not in eater_urls:
-                eater_urls.append(url)
-                print(f"Added URL to Eater restaurant URLs: {url}")
-
+            if entry is not None and self.cache.is_fresh(entry, robots.url):
+                response = cached_response(entry)
+            else:
+                response = self._request(robots.url, entry, timeout=self.timeout)
         except requests.RequestException as e:
-            print(f"Failed to fetch {url}: {e}")
-
-    print(f"Finished crawling Eater URLs. Total URLs found: {len(eater_urls)}")
-    return eater_urls
+            logger.warning("Could not read %s: %s", robots.url, e)
+            robots.allow_all = True
+            return robots
+        if response.status_code == 200:
+            robots.parse(response.text.splitlines())
+        else:
+            robots.allow_all = True
+        return robots
+
+    async def _host_limiter(self, url, host):
+        # Called with the host lock held: set up the host's limiter and robots.txt on first use
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = HostRateLimiter(self.host_rate, self.max_host_rate)
+            if self.respect_robots:
+                parsed = urlparse(url)
+                loop = asyncio.get_running_loop()
+                robots = await loop.run_in_executor(self._executor, self._load_robots, f"{parsed.scheme}://{parsed.netloc}")
+                self._robots[host] = robots
+                crawl_delay = robots.crawl_delay(DEFAULT_HEADERS['User-Agent'])
+                if crawl_delay:
+                    limiter.set_crawl_delay(float(crawl_delay))
+        return limiter
+
+    async def _wait_for_host_slot(self, url, host):
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            limiter = await self._host_limiter(url, host)
+            robots = self._robots.get(host)
+            if robots is not None and not robots.can_fetch(DEFAULT_HEADERS['User-Agent'], url):
+                raise RobotsDisallowed(f"Disallowed by robots.txt: {url}")
+            await limiter.acquire()
+        return limiter
+
+    async def robots(self, url):
+        """The parsed robots.txt of a URL's host, or None when robots.txt is ignored or the fetcher is offline."""
+        self._bind_loop()
+        if self.offline or not self.respect_robots:
+            return None
+        host = urlparse(url).netloc.lower()
+        async with self._host_locks.setdefault(host, asyncio.Lock()):
+            await self._host_limiter(url, host)
+        return self._robots.get(host)
+
+    async def _send(self, url, request):
+        # Run request() on the executor under the global and per-host limits,
+        # slowing the host down and retrying when it answers 429. A global
+        # slot is only held while the request runs, so requests queued behind
+        # a slow or throttled host do not hold up the other hosts.
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc.lower()
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with host_semaphore:
+            for attempt in range(THROTTLE_RETRIES + 1):
+                with metrics.timer('rate_wait'):
+                    limiter = await self._wait_for_host_slot(url, host)
+                async with self._global_semaphore:
+                    started = time.monotonic()
+                    response = await loop.run_in_executor(self._executor, request)
+                latency = time.monotonic() - started
+                metrics.add_time('fetch', latency)
+                metrics.observe_latency(host, latency)
+                metrics.count('requests')
+                if response is None or response.status_code != 429:
+                    limiter.record_response(latency)
+                    return response
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                limiter.record_throttle(retry_after)
+                metrics.count('throttled')
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    break
+                logger.warning("Rate limited by %s; slowing down to %.2f requests/s.", host, limiter.rate)
+            return response
+
+    async def fetch(self, url, abort_if=None, **kwargs):
+        """Fetch a URL, respecting the global and per-host limits. Raises requests.RequestException.
+
+        With `abort_if`, a 200 body is downloaded in chunks and each chunk is
+        passed to abort_if(chunk); once it returns True the connection is
+        closed, nothing is cached and None is returned. Cached responses are
+        returned whole without being checked.
+        """
+        self._bind_loop()
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None and (self.offline or self.cache.is_fresh(entry, url)):
+                self.cache.hits += 1
+                return cached_response(entry)
+        if self.offline:
+            raise OfflineCacheMiss(f"Not in cache (offline mode): {url}")
+        kwargs.setdefault('timeout', self.timeout)
+        return await self._send(url, functools.partial(self._request, url, entry, abort_if, **kwargs))
+
+    async def stream(self, url, consume, chunk_size=64 * 1024):
+        """Fetch a URL and pass its body to consume(chunk) as it arrives; consume returns False to stop early.
+
+        Only 200 bodies are streamed. Streamed responses bypass the response
+        cache and their content is not kept. Raises requests.RequestException.
+        """
+        self._bind_loop()
+        if self.offline:
+            raise OfflineCacheMiss(f"Streaming is not available offline: {url}")
+        return await self._send(url, functools.partial(self._stream, url, consume, chunk_size))
+
+    def _stream(self, url, consume, chunk_size):
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 200:
+                for chunk in response.iter_content(chunk_size):
+                    metrics.count('bytes_downloaded', len(chunk))
+                    if consume(chunk) is False:
+                        break
+        return response
+
+    def _request(self, url, entry, abort_if=None, **kwargs):
+        if abort_if is not None:
+            kwargs['stream'] = True
+        if entry is None or self.cache is None:
+            if self.cache is not None:
+                self.cache.misses += 1
+            response = self.session.get(url, **kwargs)
+        else:
+            # Revalidate the stale entry with a conditional request
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+            response = self.session.get(url, headers=headers, **kwargs)
+            if response.status_code == 304:
+                response.close()
+                self.cache.revalidated += 1
+                self.cache.refresh(url)
+                return cached_response(entry)
+            self.cache.misses += 1
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            metrics.count('retries', len(retries.history))
+        if abort_if is not None and response.status_code == 200:
+            chunks = []
+            for chunk in response.iter_content(ABORT_CHUNK_SIZE):
+                chunks.append(chunk)
+                if abort_if(chunk):
+                    response.close()
+                    self.aborted += 1
+                    metrics.count('aborted_downloads')
+                    metrics.count('bytes_downloaded', sum(map(len, chunks)))
+                    return None
+            response._content = b''.join(chunks)
+            response._content_consumed = True
+        metrics.count('bytes_downloaded', len(response.content))
+        if self.cache is not None and response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+DATED_PATH_PATTERN = re.compile(r'/(20\d{2})(?:/(\d{1,2}))?(?:/(\d{1,2}))?(?=/|$)')
+
+def url_priority(url, cutoff_date):
+    """Score a URL for the crawl frontier: newer dated paths and /maps/ pages first.
+
+    Returns None for dated paths that are entirely older than the cutoff, so
+    those branches are pruned before they are fetched.
+    """
+    path = urlparse(url).path
+    match = DATED_PATH_PATTERN.search(path)
+    if match:
+        year = int(match.group(1))
+        month = int(match.group(2)) if match.group(2) else 12
+        if not 1 <= month <= 12:
+            return 0
+        day = int(match.group(3)) if match.group(3) else calendar.monthrange(year, month)[1]
+        try:
+            latest_date = datetime(year, month, min(day, calendar.monthrange(year, month)[1]))
+        except ValueError:
+            return 0
+        if latest_date.date() < cutoff_date.date():
+            return None
+        return latest_date.toordinal()
+    if '/maps/' in path:
+        return datetime.now().toordinal() + 1
+    return 0
+
+class Frontier:
+    """Crawl frontier with set-backed membership and date-aware priority.
+
+    URLs are deduplicated on their normalized form when enqueued and popped
+    highest priority first (see url_priority), ties in insertion order.
+    """
+
+    def __init__(self, urls=(), cutoff_date=None):
+        self.cutoff_date = cutoff_date or datetime.now() - timedelta(days=547.5)
+        self.pruned = 0
+        self._heap = []
+        self._queued = set()
+        self._counter = 0
+        for url in urls:
+            self.push(url)
+
+    def push(self, url):
+        """Enqueue a URL. Returns False if it was already queued or pruned as too old."""
+        url_normalized = normalize_url(url)
+        if url_normalized in self._queued:
+            return False
+        priority = url_priority(url_normalized, self.cutoff_date)
+        if priority is None:
+            self.pruned += 1
+            return False
+        self._counter += 1
+        heapq.heappush(self._heap, (-priority, self._counter, url))
+        self._queued.add(url_normalized)
+        return True
+
+    def pop(self):
+        url = heapq.heappop(self._heap)[2]
+        self._queued.discard(normalize_url(url))
+        return url
+
+    def peek(self, n):
+        """The next n URLs in pop order, in O(n log n) however large the frontier is."""
+        # Walk the heap from its root: the next entry is always the smallest
+        # of the children of the entries already taken
+        heap = self._heap
+        candidates = [(heap[0], 0)] if heap else []
+        urls = []
+        while candidates and len(urls) < n:
+            entry, i = heapq.heappop(candidates)
+            urls.append(entry[2])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child], child))
+        return urls
+
+    def __contains__(self, url):
+        return normalize_url(url) in self._queued
+
+    def __len__(self):
+        return len(self._heap)
+
+def _prefetch_frontier(fetch, to_visit, visited, pending, depth):
+    """Start fetching the next `depth` URLs the crawler will pop, without changing crawl order."""
+    for url in to_visit.peek(depth):
+        if url not in pending and normalize_url(url) not in visited:
+            pending[url] = asyncio.ensure_future(fetch(url))
+
+async def _take_prefetched(fetch, pending, url):
+    task = pending.pop(url, None)
+    if task is None:
+        return await fetch(url)
+    return await task
+
+def _cancel_prefetched(pending):
+    for task in pending.values():
+        task.cancel()
+    pending.clear()
+
+def _run(coro_fn, *args, fetcher=None, **kwargs):
+    """Run an async stage from synchronous code, creating (and closing) a fetcher if none is given."""
+    async def runner():
+        if fetcher is not None:
+            return await coro_fn(*args, fetcher=fetcher, **kwargs)
+        own_fetcher = AsyncFetcher()
+        try:
+            return await coro_fn(*args, fetcher=own_fetcher, **kwargs)
+        finally:
+            own_fetcher.close()
+    return asyncio.run(runner())
+
+CrawlProgress = namedtuple('CrawlProgress', ['visited', 'to_visit', 'articles', 'finished'])
+
+class CrawlState:
+    """Persistent SQLite store of crawl progress, so runs can resume and refresh incrementally.
+
+    It records every URL seen per source (with first/last seen times), the
+    crawl frontier, and the restaurants extracted from each article. A run
+    that did not complete is resumed by the next one: finished crawls are
+    not repeated, the frontier is reloaded and extracted articles are not
+    fetched again. In incremental mode, articles seen by earlier runs are
+    skipped by the crawler and their stored restaurants are reused.
+    """
+
+    def __init__(self, path='.state/crawl_state.sqlite', incremental=False):
+        self.path = path
+        self.incremental = incremental
+        self.run_id = None
+        self.resumed = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                status TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crawls (
+                run_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, source)
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                source TEXT NOT NULL,
+                url TEXT NOT NULL,
+                original_url TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_run INTEGER NOT NULL,
+                is_article INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, url)
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                source TEXT NOT NULL,
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (source, url)
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                run_id INTEGER NOT NULL,
+                extracted_at REAL NOT NULL,
+                restaurants TEXT NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def begin_run(self, fresh=False):
+        """Resume the last run if it did not complete, otherwise start a new one."""
+        last = self._db.execute('SELECT id, status FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+        if last is not None and last[1] != 'completed' and not fresh:
+            self.run_id = last[0]
+            self.resumed = True
+            self._db.execute("UPDATE runs SET status = 'running' WHERE id = ?", (self.run_id,))
+            logger.info("Resuming crawl run %s (previous status: %s)", self.run_id, last[1])
+        else:
+            cursor = self._db.execute("INSERT INTO runs (started_at, status) VALUES (?, 'running')", (time.time(),))
+            self.run_id = cursor.lastrowid
+            self.resumed = False
+            self._db.execute('DELETE FROM frontier')
+            logger.info("Starting crawl run %s", self.run_id)
+        self._db.commit()
+        return self.run_id
+
+    def finish_run(self, status='completed'):
+        self._db.execute('UPDATE runs SET status = ?, finished_at = ? WHERE id = ?', (status, time.time(), self.run_id))
+        self._db.commit()
+
+    def load_crawl(self, source, start_url):
+        """Return the crawl progress for a source in the current run, starting it if needed."""
+        row = self._db.execute(
+            'SELECT finished FROM crawls WHERE run_id = ? AND source = ?', (self.run_id, source)
+        ).fetchone()
+        articles = [
+            url for (url,) in self._db.execute(
+                'SELECT original_url FROM seen WHERE source = ? AND last_run = ? AND is_article = 1 ORDER BY last_seen',
+                (source, self.run_id),
+            )
+        ]
+        if row is not None and row[0]:
+            return CrawlProgress(set(), [], articles, True)
+        if row is None:
+            self._db.execute('INSERT INTO crawls (run_id, source) VALUES (?, ?)', (self.run_id, source))
+            self._db.execute('DELETE FROM frontier WHERE source = ?', (source,))
+            self._push(source, [start_url])
+            self._db.commit()
+        visited = {
+            url for (url,) in self._db.execute(
+                'SELECT url FROM seen WHERE source = ? AND last_run = ?', (source, self.run_id)
+            )
+        }
+        if self.incremental:
+            visited |= self.known_articles(source) - {normalize_url(start_url)}
+        to_visit = [
+            url for (url,) in self._db.execute(
+                'SELECT url FROM frontier WHERE source = ? ORDER BY position', (source,)
+            )
+        ]
+        if row is not None:
+            logger.info("Resuming %s crawl: %d URLs seen, %d in the frontier", source, len(visited), len(to_visit))
+        return CrawlProgress(visited, to_visit, articles, False)
+
+    def known_articles(self, source):
+        """Normalized URLs of articles collected by earlier runs."""
+        return {
+            url for (url,) in self._db.execute(
+                'SELECT url FROM seen WHERE source = ? AND is_article = 1 AND last_run != ?', (source, self.run_id)
+            )
+        }
+
+    def _push(self, source, urls):
+        position = self._db.execute('SELECT COALESCE(MAX(position), 0) FROM frontier').fetchone()[0]
+        for url in urls:
+            position += 1
+            self._db.execute('INSERT OR IGNORE INTO frontier VALUES (?, ?, ?)', (source, url, position))
+
+    def record_page(self, source, url, url_normalized, new_links=(), is_article=False):
+        """Persist one crawl step: pop the URL, push its new links and mark it seen."""
+        now = time.time()
+        self._db.execute('DELETE FROM frontier WHERE source = ? AND url = ?', (source, url))
+        self._push(source, new_links)
+        self._db.execute(
+            """
+            INSERT INTO seen (source, url, original_url, first_seen, last_seen, last_run, is_article)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source, url) DO UPDATE SET
+                last_seen = excluded.last_seen,
+                last_run = excluded.last_run,
+                is_article = MAX(is_article, excluded.is_article)
+            """,
+            (source, url_normalized, url, now, now, self.run_id, int(is_article)),
+        )
+        self._db.commit()
+
+    def finish_crawl(self, source):
+        self._db.execute('UPDATE crawls SET finished = 1 WHERE run_id = ? AND source = ?', (self.run_id, source))
+        self._db.execute('DELETE FROM frontier WHERE source = ?', (source,))
+        self._db.commit()
+
+    def previous_articles(self, source, since):
+        """Article URLs extracted by earlier runs since a timestamp, for incremental runs."""
+        return [
+            url for (url,) in self._db.execute(
+                'SELECT url FROM articles WHERE source = ? AND run_id != ? AND extracted_at >= ? ORDER BY extracted_at',
+                (source, self.run_id, since),
+            )
+        ]
+
+    def load_article(self, url):
+        """Return stored restaurants for an article this run may reuse, or None."""
+        row = self._db.execute(
+            'SELECT run_id, restaurants FROM articles WHERE url = ?', (normalize_url(url),)
+        ).fetchone()
+        if row is None or (row[0] != self.run_id and not self.incremental):
+            return None
+        return json.loads(row[1])
+
+    def save_article(self, source, url, restaurants):
+        self._db.execute(
+            'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?)',
+            (normalize_url(url), source, self.run_id, time.time(), json.dumps(restaurants)),
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+def date_is_too_old(article_date_str, cutoff_date):
+    """Return True if a byline datetime string rules the article out (too old or unparseable)."""
+    try:
+        article_date = datetime.fromisoformat(article_date_str)
+    except ValueError:
+        logger.warning("Invalid date format in article: %s", article_date_str)
+        return True
+    if article_date.tzinfo is not None:
+        article_date = article_date.astimezone().replace(tzinfo=None)
+    if article_date < cutoff_date:
+        logger.debug("Article is older than 1.5 years: %s", article_date)
+        return True
+    return False
+
+SNIFF_LIMIT = 256 * 1024  # Bytes of a page searched for its date before giving up
+
+def is_eater_byline(attrs):
+    return 'c-byline__item' in (attrs.get('class') or '').split() and attrs.get('data-ui') == 'timestamp'
+
+def is_any_time_tag(attrs):
+    return True
 
-def extract_eater_restaurants(url, processed_urls):
-    url_normalized = normalize_url(url)
-    if url_normalized in processed_urls:
-        print(f"URL already processed: {url}")
-        return []
-    print(f"\nExtracting restaurants from Eater URL: {url}")
-    processed_urls.add(url_normalized)
+class PublishedDateSniffer(HTMLParser):
+    """Read the start of a page as it streams in and decide from its date whether to keep downloading.
+
+    This is the one date rule for articles, streamed or not. The verdict
+    comes from the byline <time datetime> (the first tag matching
+    is_byline). Only when no byline appears in the first SNIFF_LIMIT bytes
+    (or the whole page, if shorter) do the article:published_time /
+    article:modified_time meta tags decide, using the newer of the two.
+    Pages with neither are kept. Pass sniffer.too_old as AsyncFetcher.fetch's
+    abort_if, then call finish() on whatever was downloaded.
+    """
+
+    def __init__(self, cutoff_date, is_byline):
+        super().__init__(convert_charrefs=False)
+        self.cutoff_date = cutoff_date
+        self.is_byline = is_byline
+        self.meta_dates = []
+        self.verdict = None  # True once ruled out, False once kept
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._sniffed = 0
+
+    def finish(self, content):
+        """Sniff the rest of a downloaded page (cached pages arrive unsniffed). Returns True if it is too old."""
+        position = self._sniffed
+        while self.verdict is None and position < len(content):
+            self.too_old(content[position:position + ABORT_CHUNK_SIZE])
+            position += ABORT_CHUNK_SIZE
+        if self.verdict is None:
+            self._decide_from_meta()
+        return self.verdict is True
+
+    def too_old(self, chunk):
+        if self.verdict is None:
+            self._sniffed += len(chunk)
+            self.feed(self._decoder.decode(chunk))
+            if self.verdict is None and self._sniffed >= SNIFF_LIMIT:
+                self._decide_from_meta()
+        return self.verdict is True
+
+    def _decide_from_meta(self):
+        # No byline: fall back to the meta tags, keeping pages that have none
+        self.verdict = bool(self.meta_dates) and max(self.meta_dates) < self.cutoff_date
+        if self.verdict:
+            logger.debug("Article is older than 1.5 years: %s", max(self.meta_dates))
+
+    def handle_starttag(self, tag, attrs):
+        if self.verdict is not None:
+            return
+        if tag == 'meta':
+            attrs = dict(attrs)
+            if attrs.get('property') in ('article:published_time', 'article:modified_time'):
+                date = parse_feed_date(attrs.get('content'))
+                if date is not None:
+                    self.meta_dates.append(date)
+        elif tag == 'time':
+            attrs = dict(attrs)
+            if self.is_byline(attrs):
+                self.verdict = bool(attrs.get('datetime')) and date_is_too_old(attrs['datetime'], self.cutoff_date)
+
+async def fetch_recent_page(fetcher, url, cutoff_date, is_byline):
+    """Fetch a page, abandoning the download as soon as its date rules it out. Returns None in that case."""
+    sniffer = PublishedDateSniffer(cutoff_date, is_byline)
+    response = await fetcher.fetch(url, abort_if=sniffer.too_old)
+    if response is None or sniffer.finish(response.content):
+        return None
+    return response
+
+# Sitemap/feed parsing for --discovery feeds; each host's robots.txt Sitemap: lines are read too
+FEED_ENTRY_TAGS = {'url': 'page', 'item': 'page', 'entry': 'page', 'sitemap': 'sitemap'}
+FEED_DATE_TAGS = ('lastmod', 'publication_date', 'updated', 'published', 'pubDate')
+MAX_FEED_ENTRIES = 50000  # Per feed, so one huge sitemap cannot exhaust memory
+MAX_DISCOVERY_FEEDS = 50
+
+FeedEntry = namedtuple('FeedEntry', ['kind', 'url', 'date'])
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def parse_feed_date(value):
+    """Parse a W3C datetime (sitemaps, Atom) or RFC 822 date (RSS) into a naive local datetime."""
+    if not value:
+        return None
+    value = value.strip()
     try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if date.tzinfo is not None:
+        date = date.astimezone().replace(tzinfo=None)
+    return date
+
+class FeedParser:
+    """Incremental parser for sitemaps, sitemap indexes, RSS and Atom feeds.
+
+    Chunks are fed as they are downloaded and every <url>, <sitemap>, <item>
+    or <entry> becomes a FeedEntry as soon as it closes; its element is then
+    cleared so memory stays flat however large the feed is. Gzipped sitemaps
+    are recognised by their magic bytes and decompressed on the fly.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._parser = XMLPullParser(events=('end',))
+        self._decompressor = None
+        self._started = False
+
+    def feed(self, chunk):
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b'\x1f\x8b':
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._parser.feed(chunk)
+        for _, element in self._parser.read_events():
+            kind = FEED_ENTRY_TAGS.get(_local_name(element.tag))
+            if kind is not None:
+                entry = self._entry(kind, element)
+                if entry is not None:
+                    self.entries.append(entry)
+                element.clear()
+        return len(self.entries) < MAX_FEED_ENTRIES
+
+    @staticmethod
+    def _entry(kind, element):
+        # Only direct children count, so the <image:loc> or <video:*> of an
+        # image or video sitemap cannot stand in for the page's own URL. The
+        # one nested date is a news sitemap's <news:news><news:publication_date>.
+        url = None
+        date = None
+        for child in element:
+            name = _local_name(child.tag)
+            if name == 'news' and date is None:
+                date = next((parse_feed_date(grandchild.text) for grandchild in child
+                             if _local_name(grandchild.tag) in FEED_DATE_TAGS), None)
+            elif name == 'loc' and child.text and url is None:
+                url = child.text.strip()
+            elif name == 'link' and url is None:
+                # RSS puts the URL in the text, Atom in the href of the alternate link
+                if child.get('href') and child.get('rel', 'alternate') == 'alternate':
+                    url = child.get('href').strip()
+                elif child.text and child.text.strip():
+                    url = child.text.strip()
+            elif name in FEED_DATE_TAGS and date is None:
+                date = parse_feed_date(child.text)
+        return FeedEntry(kind, url, date) if url else None
+
+# Structured-data fast path: schema.org JSON-LD and Next.js __NEXT_DATA__ scripts
+STRUCTURED_DATA_MARKERS = (b'application/ld+json', b'"__NEXT_DATA__"')
+RESTAURANT_TYPES = frozenset({
+    'Restaurant', 'FoodEstablishment', 'FastFoodRestaurant', 'CafeOrCoffeeShop', 'BarOrPub', 'Bakery',
+    'Brewery', 'Winery', 'Distillery', 'IceCreamShop', 'LocalBusiness',
+})
+VENUE_HINT_KEYS = ('address', 'streetAddress', 'street', 'telephone', 'phone', 'phoneNumber', 'geo', 'latitude', 'lat')
+
+def structured_data_blobs(content):
+    """The bodies of a page's JSON-LD and __NEXT_DATA__ <script> tags, found by scanning the raw bytes for their markers."""
+    for marker in STRUCTURED_DATA_MARKERS:
+        position = content.find(marker)
+        while position != -1:
+            # The marker must sit inside an opening <script> tag
+            tag_start = content.rfind(b'<', 0, position)
+            start = content.find(b'>', position) + 1
+            end = content.find(b'</script', start)
+            if start == 0 or end == -1:
+                break
+            if content.startswith(b'<script', tag_start):
+                yield content[start:end]
+            position = content.find(marker, end)
+
+def _first_value(data, keys):
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+def _names(value):
+    # Cuisine-like fields: a string, a list of strings or a list of {"name": ...} objects
+    if isinstance(value, str):
+        return [value.strip()] if value.strip() else []
+    if isinstance(value, dict):
+        return _names(value.get('name'))
+    if isinstance(value, list):
+        return [name for item in value for name in _names(item)]
+    return []
+
+def _venue_address(data):
+    address = _first_value(data, ('address', 'formattedAddress', 'fullAddress'))
+    if isinstance(address, str):
+        return address.strip()
+    parts = address if isinstance(address, dict) else data
+    street = _first_value(parts, ('streetAddress', 'street', 'line1', 'address1'))
+    locality = _first_value(parts, ('addressLocality', 'city', 'locality'))
+    region = _first_value(parts, ('addressRegion', 'state', 'region'))
+    postal = _first_value(parts, ('postalCode', 'zip', 'zipCode'))
+    region = ' '.join(str(part) for part in (region, postal) if part)
+    line = ', '.join(str(part).strip() for part in (street, locality, region) if part)
+    return line or None
+
+def _venue_coordinates(data):
+    for container in (data, data.get('geo'), data.get('coordinates'), data.get('location')):
+        if not isinstance(container, dict):
+            continue
+        latitude = _first_value(container, ('latitude', 'lat'))
+        longitude = _first_value(container, ('longitude', 'lng', 'lon'))
+        try:
+            return float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            continue
+    return None, None
+
+def _venue_website(data, page_host):
+    website = _first_value(data, ('website', 'websiteUrl', 'websiteURL', 'url'))
+    if not isinstance(website, str) or not website.startswith(('http://', 'https://')):
+        return None
+    # A url pointing back at the article is the venue's anchor, not its site
+    if urlparse(website).netloc.lower() == page_host:
+        return None
+    return website
+
+def _is_venue(data):
+    types = data.get('@type')
+    if types is not None:
+        types = {types} if isinstance(types, str) else set(types) if isinstance(types, list) else set()
+        return bool(types & RESTAURANT_TYPES)
+    return isinstance(data.get('name'), str) and any(key in data for key in VENUE_HINT_KEYS)
+
+def structured_restaurants(content, url):
+    """Restaurant rows from a page's embedded JSON-LD / __NEXT_DATA__, or [] if it has none.
+
+    Unlike the DOM extractors this also fills Latitude, Longitude and Cuisine.
+    """
+    page_host = urlparse(url).netloc.lower()
+    restaurants = []
+    seen = set()
+    for blob in structured_data_blobs(content):
+        try:
+            data = json.loads(blob)
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(reversed(item))
+                continue
+            if not isinstance(item, dict):
+                continue
+            if not _is_venue(item):
+                stack.extend(reversed(list(item.values())))
+                continue
+            name = _first_value(item, ('name',))
+            if not isinstance(name, str):
+                continue
+            latitude, longitude = _venue_coordinates(item)
+            phone = _first_value(item, ('telephone', 'phone', 'phoneNumber'))
+            row = {
+                'Name': name.strip(),
+                'Address': _venue_address(item),
+                'Phone': str(phone).strip() if phone else None,
+                'Website': _venue_website(item, page_host),
+                'Latitude': latitude,
+                'Longitude': longitude,
+                'Cuisine': ', '.join(_names(_first_value(item, ('servesCuisine', 'cuisine', 'cuisines', 'cuisineTags')))) or None,
+            }
+            if not (row['Address'] or row['Phone'] or row['Website']):
+                # A place such as the city or neighborhood, which may hold the venues
+                stack.extend(reversed(list(item.values())))
+                continue
+            # The same venue often appears in both JSON-LD and the Next.js payload
+            key = (row['Name'], row['Address'])
+            if key not in seen:
+                seen.add(key)
+                restaurants.append(row)
+    return restaurants
+
+MARKETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'markets.json')
+DEFAULT_MARKET = 'dallas'
+
+class Source:
+    """A restaurant-list publisher covering one city.
+
+    Subclasses describe how to discover the city's articles (start URL,
+    feeds, which links to follow and which pages are articles), how to date
+    an article (is_byline, read by PublishedDateSniffer) and how to turn an
+    article page into restaurant rows (extract_structured from embedded JSON,
+    else extract_cards from the DOM).
+    """
+
+    name = None
+    label = None
+    article_strainer = None
+    start_url = None
+    feed_urls = ()
+
+    def __init__(self, city=DEFAULT_MARKET, start_url=None):
+        self.city = city
+        if start_url is not None:
+            self.start_url = start_url
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.city!r})"
+
+    def follows(self, url_normalized):
+        """Whether the crawler should visit a (normalized) link."""
+        raise NotImplementedError
+
+    def is_article(self, url_normalized):
+        """Whether a (normalized) URL is an article to extract restaurants from."""
+        raise NotImplementedError
+
+    @staticmethod
+    def is_byline(attrs):
+        """Whether a streamed <time> tag's attributes mark the article's byline date."""
+        return is_any_time_tag(attrs)
+
+    def extract_structured(self, content, url):
+        """Restaurant rows from the page's embedded structured data, or [] to fall back to extract_cards."""
+        return structured_restaurants(content, url)
+
+    def extract_cards(self, page):
+        """Restaurant rows (Name, Address, Phone, Website) from a page parsed with article_strainer."""
+        raise NotImplementedError
+
+class EaterSource(Source):
+    name = 'eater'
+    label = 'Eater'
+    article_strainer = EATER_ARTICLE_STRAINER
+    is_byline = staticmethod(is_eater_byline)
+
+    def __init__(self, city=DEFAULT_MARKET, start_url=None, base_url=None):
+        self.base_url = (base_url or f'https://{city}.eater.com').rstrip('/')
+        self.start_url = self.base_url + '/'
+        self.feed_urls = (self.base_url + '/sitemaps', self.base_url + '/rss/index.xml')
+        super().__init__(city, start_url)
+
+    def link_prefixes(self):
+        # Map pages, plus the dated sections young enough to hold recent articles
+        cutoff_date = datetime.now() - timedelta(days=547.5)
+        years = range(cutoff_date.year, datetime.now().year + 1)
+        return (f'{self.base_url}/maps',) + tuple(f'{self.base_url}/{year}' for year in years)
+
+    def follows(self, url_normalized):
+        return url_normalized.startswith(self.link_prefixes())
+
+    def is_article(self, url_normalized):
+        # Collect URLs that contain restaurant data (heuristic)
+        return self.follows(url_normalized) and ('/maps/' in url_normalized or '/article/' in url_normalized)
+
+    def extract_cards(self, page):
         restaurants = []
-
-        # Extract publication date
-        time_tag = soup.find('time', class_='c-byline__item', attrs={'data-ui': 'timestamp'})
-        if time_tag and 'datetime' in time_tag.attrs:
-            article_date_str = time_tag['datetime']
-            try:
-                article_date = datetime.fromisoformat(article_date_str)
-                cutoff_date = datetime.now() - timedelta(days=547.5)  # 1.5 years
-                if article_date < cutoff_date:
-                    print(f"Article is older than 1.5 years: {article_date}")
-                    return []  # Skip this article
-            except ValueError:
-                print(f"Invalid date format in article: {article_date_str}")
-                return []
-
         # Find all restaurant sections
-        sections = soup.find_all('section', class_='c-mapstack__card')
-        print(f"Found {len(sections)} restaurant sections on the page.")
+        sections = page.soup.find_all('section', class_='c-mapstack__card')
+        logger.debug("Found %d restaurant sections on the page.", len(sections))
         for section in sections:
             name_tag = section.find('h1')
             address_tag = section.find('div', class_='c-mapstack__address')
@@ -123,104 +1468,33 @@ def extract_eater_restaurants(url, processed_urls):
                     'Phone': phone,
                     'Website': website
                 })
-                print(f"Extracted restaurant: {name}")
-
+                logger.debug("Extracted restaurant: %s", name)
         return restaurants
 
-    except requests.RequestException as e:
-        print(f"Error extracting from {url}: {e}")
-        return []
-
-def get_infatuation_links(start_url, max_articles=5):
-    print(f"\nStarting to crawl The Infatuation URLs from {start_url}")
-    visited = set()
-    to_visit = [start_url]
-    infatuation_urls = []
-    cutoff_date = datetime.now() - timedelta(days=547.5)  # Approximately 1.5 years
-    desired_prefix = 'https://www.theinfatuation.com/dallas/guides'
-
-    while to_visit:
-        if len(infatuation_urls) >= max_articles:
-            print(f"Reached the maximum number of articles ({max_articles}). Stopping crawl.")
-            break
-        url = to_visit.pop()
-        url_normalized = normalize_url(url)
-        print(f"Processing URL: {url}")
-        if url_normalized in visited:
-            print(f"Skipping URL (already visited): {url}")
-            continue
-        visited.add(url_normalized)
-        try:
-            response = requests.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Extract publication date
-            time_tag = soup.find('time')
-            if time_tag and 'datetime' in time_tag.attrs:
-                article_date_str = time_tag['datetime']
-                try:
-                    article_date = datetime.fromisoformat(article_date_str)
-                    if article_date < cutoff_date:
-                        print(f"Article is older than 1.5 years: {article_date}")
-                        continue  # Skip this article
-                except ValueError:
-                    print(f"Invalid date format in article: {article_date_str}")
-                    continue
+class InfatuationSource(Source):
+    name = 'infatuation'
+    label = 'Infatuation'
+    article_strainer = INFATUATION_ARTICLE_STRAINER
 
-            # Find all links that start with the desired prefix
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if 'tel:' in href:
-                    print(f"Skipping telephone link: {href}")
-                    continue  # Skip links with 'tel:'
-                full_url = urljoin(url, href)
-                full_url_normalized = normalize_url(full_url)
-                # Only include URLs that start with the desired prefix
-                if full_url_normalized.startswith(desired_prefix):
-                    if full_url_normalized not in visited and full_url_normalized not in to_visit:
-                        to_visit.append(full_url)
-                        print(f"Found new URL to visit: {full_url}")
-
-            # Collect URLs that might contain restaurant data
-            if url_normalized.startswith(desired_prefix) and url not in infatuation_urls:
-                infatuation_urls.append(url)
-                print(f"Added URL to Infatuation restaurant URLs: {url}")
+    def __init__(self, city=DEFAULT_MARKET, start_url=None, base_url='https://www.theinfatuation.com'):
+        base_url = base_url.rstrip('/')
+        self.guide_prefix = f'{base_url}/{city}/guides'
+        self.start_url = self.guide_prefix
+        self.feed_urls = (base_url + '/sitemap.xml',)
+        super().__init__(city, start_url)
 
-        except requests.RequestException as e:
-            print(f"Failed to fetch {url}: {e}")
+    def follows(self, url_normalized):
+        return url_normalized.startswith(self.guide_prefix)
 
-    print(f"Finished crawling Infatuation URLs. Total URLs found: {len(infatuation_urls)}")
-    return infatuation_urls
+    def is_article(self, url_normalized):
+        # Guides below the city's guide index might contain restaurant data
+        return url_normalized.startswith(self.guide_prefix + '/')
 
-def extract_infatuation_restaurants(url, processed_urls):
-    url_normalized = normalize_url(url)
-    if url_normalized in processed_urls:
-        print(f"URL already processed: {url}")
-        return []
-    print(f"\nExtracting restaurants from Infatuation URL: {url}")
-    processed_urls.add(url_normalized)
-    try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, 'html.parser')
+    def extract_cards(self, page):
         restaurants = []
-
-        # Extract publication date
-        time_tag = soup.find('time')
-        if time_tag and 'datetime' in time_tag.attrs:
-            article_date_str = time_tag['datetime']
-            try:
-                article_date = datetime.fromisoformat(article_date_str)
-                cutoff_date = datetime.now() - timedelta(days=547.5)  # 1.5 years
-                if article_date < cutoff_date:
-                    print(f"Article is older than 1.5 years: {article_date}")
-                    return []  # Skip this article
-            except ValueError:
-                print(f"Invalid date format in article: {article_date_str}")
-                return []
-
         # Find all restaurant sections (heuristic based on HTML structure)
-        venue_cards = soup.find_all('div', class_=re.compile('styles_venueCard__'))
-        print(f"Found {len(venue_cards)} venue cards on the page.")
+        venue_cards = page.soup.find_all('div', class_=re.compile('styles_venueCard__'))
+        logger.debug("Found %d venue cards on the page.", len(venue_cards))
         for card in venue_cards:
             name_tag = card.find('h2')
             address_tag = card.find('a', attrs={'data-testid': 'venue-googleMapUrl'})
@@ -239,311 +1513,2041 @@ def extract_infatuation_restaurants(url, processed_urls):
                     'Phone': phone,
                     'Website': website
                 })
-                print(f"Extracted restaurant: {name}")
+                logger.debug("Extracted restaurant: %s", name)
+        return restaurants
+
+SOURCE_TYPES = {source_type.name: source_type for source_type in (EaterSource, InfatuationSource)}
+
+@functools.lru_cache(maxsize=None)
+def load_markets(path=MARKETS_PATH):
+    """The market config: market name -> {source name: city slug used by that source}.
+
+    A source may instead map to keyword arguments for its class, e.g.
+    {"city": "dallas", "base_url": "http://127.0.0.2:8080"} to point it at a
+    mirror or the benchmark replay server.
+    """
+    with open(path) as f:
+        markets = json.load(f)
+    for market, sources in markets.items():
+        unknown = set(sources) - set(SOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown sources for market {market!r}: {', '.join(sorted(unknown))}")
+    return markets
+
+def market_sources(market=DEFAULT_MARKET, path=MARKETS_PATH):
+    """Instantiate the sources configured for a market."""
+    markets = load_markets(path)
+    if market not in markets:
+        raise KeyError(f"Unknown market {market!r}; known markets: {', '.join(sorted(markets))}")
+    return [
+        SOURCE_TYPES[name](**options) if isinstance(options, dict) else SOURCE_TYPES[name](options)
+        for name, options in markets[market].items()
+    ]
 
+async def iter_source_links(source, max_articles=5, fetcher=None, prefetch=4, state=None):
+    """Crawl from the source's start URL, yielding each article URL as soon as it is found."""
+    fetcher = fetcher or AsyncFetcher()
+    start_url = source.start_url
+    logger.info("Starting to crawl %s URLs from %s", source.label, start_url)
+    cutoff_date = datetime.now() - timedelta(days=547.5)  # Approximately 1.5 years
+    visited = set()
+    to_visit = Frontier([start_url], cutoff_date)
+    article_urls = []
+    if state is not None:
+        progress = state.load_crawl(source.name, start_url)
+        if progress.finished:
+            logger.info("%s crawl already finished in this run. Total URLs found: %d", source.label, len(progress.articles))
+            for url in progress.articles:
+                yield url
+            return
+        visited, article_urls = progress.visited, progress.articles
+        to_visit = Frontier(progress.to_visit, cutoff_date)
+        for url in article_urls:
+            yield url
+    fetch = functools.partial(fetch_recent_page, fetcher, cutoff_date=cutoff_date, is_byline=source.is_byline)
+    pending = {}  # URLs fetched ahead of the crawl loop, aborted early if too old
+
+    try:
+        while to_visit:
+            if len(article_urls) >= max_articles:
+                logger.info("Reached the maximum number of articles (%d). Stopping crawl.", max_articles)
+                break
+            _prefetch_frontier(fetch, to_visit, visited, pending, prefetch)
+            url = to_visit.pop()
+            url_normalized = normalize_url(url)
+            logger.debug("Processing URL: %s", url)
+            if url_normalized in visited:
+                logger.debug("Skipping URL (already visited): %s", url)
+                if state is not None:
+                    state.record_page(source.name, url, url_normalized)
+                continue
+            visited.add(url_normalized)
+            new_links = []
+            is_article = False
+            try:
+                response = await _take_prefetched(fetch, pending, url)
+                # None means the download was cut short because the page is older than the cutoff
+                page = parse_page(response.content, CRAWL_STRAINER) if response is not None else None
+
+                if page is not None:
+                    # Find all links the source follows
+                    for href in page.hrefs:
+                        if 'tel:' in href:
+                            logger.debug("Skipping telephone link: %s", href)
+                            continue  # Skip links with 'tel:'
+                        full_url = urljoin(url, href)
+                        full_url_normalized = normalize_url(full_url)
+                        if source.follows(full_url_normalized):
+                            if full_url_normalized not in visited and to_visit.push(full_url):
+                                new_links.append(full_url)
+                                logger.debug("Found new URL to visit: %s", full_url)
+
+                    if source.is_article(url_normalized) and url not in article_urls:
+                        article_urls.append(url)
+                        is_article = True
+                        logger.info("Added URL to %s restaurant URLs: %s", source.label, url)
+
+            except requests.RequestException as e:
+                logger.warning("Failed to fetch %s: %s", url, e)
+
+            if state is not None:
+                state.record_page(source.name, url, url_normalized, new_links, is_article)
+            if is_article:
+                yield url
+    finally:
+        _cancel_prefetched(pending)
+    if state is not None:
+        state.finish_crawl(source.name)
+    if to_visit.pruned:
+        logger.info("Pruned %d URLs older than the cutoff before fetching them.", to_visit.pruned)
+    logger.info("Finished crawling %s URLs. Total URLs found: %d", source.label, len(article_urls))
+
+async def iter_feed_links(source, max_articles=5, fetcher=None, state=None):
+    """Discover a source's articles from its sitemaps and feeds instead of crawling pages.
+
+    Feeds are streamed through FeedParser; entries whose lastmod/pubDate is
+    older than the cutoff, or that are not source articles, are dropped
+    before any article is fetched, and nested sitemaps are only followed on
+    the source's host when they are recent enough. Yields up to max_articles
+    article URLs, newest first.
+    """
+    fetcher = fetcher or AsyncFetcher()
+    logger.info("Discovering %s articles from sitemaps and feeds", source.label)
+    cutoff_date = datetime.now() - timedelta(days=547.5)  # Approximately 1.5 years
+    start_url = source.start_url
+    host = urlparse(start_url).netloc.lower()
+    visited = set()
+    found = []
+    if state is not None:
+        progress = state.load_crawl(source.name, start_url)
+        found = progress.articles
+        for url in found:
+            yield url
+        if progress.finished:
+            return
+        visited = progress.visited | {normalize_url(url) for url in found}
+
+    queue = deque(source.feed_urls)
+    robots = await fetcher.robots(start_url)
+    if robots is not None:
+        queue.extend(robots.site_maps() or ())
+    seen_feeds = set()
+    candidates = []
+    pruned = 0
+    while queue and len(seen_feeds) < MAX_DISCOVERY_FEEDS:
+        feed_url = queue.popleft()
+        if normalize_url(feed_url) in seen_feeds:
+            continue
+        seen_feeds.add(normalize_url(feed_url))
+        parser = FeedParser()
+        try:
+            response = await fetcher.stream(feed_url, parser.feed)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning("Failed to fetch feed %s: %s", feed_url, e)
+            continue
+        except (ParseError, zlib.error, EOFError) as e:
+            # Broken XML or a corrupt .gz; only this feed is affected
+            logger.warning("Malformed feed %s (%s); keeping the %d entries read before the error", feed_url, e, len(parser.entries))
+        logger.info("Read %d entries from %s", len(parser.entries), feed_url)
+        for entry in parser.entries:
+            if (entry.date is not None and entry.date < cutoff_date) or url_priority(entry.url, cutoff_date) is None:
+                pruned += 1
+            elif entry.kind == 'sitemap':
+                if urlparse(entry.url).netloc.lower() == host:
+                    queue.append(entry.url)
+            elif source.is_article(normalize_url(entry.url)) and normalize_url(entry.url) not in visited:
+                visited.add(normalize_url(entry.url))
+                candidates.append((entry.date or datetime.min, entry.url))
+
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    for _, url in candidates[:max(0, max_articles - len(found))]:
+        found.append(url)
+        if state is not None:
+            state.record_page(source.name, url, normalize_url(url), is_article=True)
+        yield url
+    # An empty discovery leaves the crawl unfinished so --discovery auto can fall back to crawling
+    if state is not None and found:
+        state.finish_crawl(source.name)
+    logger.info("Finished discovering %s articles. Total URLs found: %d (%d old entries skipped)", source.label, len(found), pruned)
+
+async def extract_source_restaurants_async(source, url, processed_urls, fetcher=None, state=None):
+    """Extract the restaurant rows of one of the source's articles, or reuse them from the crawl state."""
+    fetcher = fetcher or AsyncFetcher()
+    url_normalized = normalize_url(url)
+    if url_normalized in processed_urls:
+        logger.debug("URL already processed: %s", url)
+        return []
+    processed_urls.add(url_normalized)
+    if state is not None:
+        restaurants = state.load_article(url)
+        if restaurants is not None:
+            logger.info("Loaded %d restaurants for %s from crawl state", len(restaurants), url)
+            return restaurants
+    logger.info("Extracting restaurants from %s URL: %s", source.label, url)
+    try:
+        cutoff_date = datetime.now() - timedelta(days=547.5)  # 1.5 years
+        sniffer = PublishedDateSniffer(cutoff_date, source.is_byline)
+        # None means the download was cut short because the article is older than the cutoff
+        response = await fetcher.fetch(url, abort_if=sniffer.too_old)
+        restaurants = []
+        # Pages that arrive whole (cached, or shorter than the sniff limit) are dated here
+        if response is not None and not sniffer.finish(response.content):
+            # Fast path: venues decoded in bulk from the page's embedded JSON, without a DOM parse
+            with metrics.timer('extract'):
+                structured = source.extract_structured(response.content, url)
+            if structured:
+                metrics.count('articles_structured')
+                restaurants = structured
+            else:
+                page = parse_page(response.content, source.article_strainer)
+                with metrics.timer('extract'):
+                    restaurants = source.extract_cards(page)
+        metrics.count('articles_extracted')
+        metrics.count('restaurants_extracted', len(restaurants))
+
+        if state is not None:
+            state.save_article(source.name, url, restaurants)
         return restaurants
 
     except requests.RequestException as e:
-        print(f"Error extracting from {url}: {e}")
+        logger.warning("Error extracting from %s: %s", url, e)
         return []
 
-def combine_and_deduplicate(eater_data, infatuation_data):
-    print(f"\nCombining data from Eater ({len(eater_data)} entries) and Infatuation ({len(infatuation_data)} entries)")
-    df_eater = pd.DataFrame(eater_data)
-    df_infatuation = pd.DataFrame(infatuation_data)
-
-    combined_df = pd.concat([df_eater, df_infatuation], ignore_index=True)
-    before_dedup = len(combined_df)
-    combined_df.drop_duplicates(subset=['Website'], inplace=True)
-    after_dedup = len(combined_df)
-    print(f"Combined data has {before_dedup} entries before deduplication, {after_dedup} after deduplication")
-    return combined_df
+# Dallas-era entry points, kept for scripts that call them directly
+
+def _site_origin(url):
+    parts = urlparse(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+async def iter_eater_links(start_url, max_articles=5, fetcher=None, prefetch=4, state=None):
+    # Links are followed on the start URL's own host, so a mirror or replay server can stand in for Eater
+    source = EaterSource(start_url=start_url, base_url=_site_origin(start_url))
+    async for url in iter_source_links(source, max_articles, fetcher, prefetch, state):
+        yield url
+
+async def get_eater_links_async(start_url, max_articles=5, fetcher=None, prefetch=4, state=None):
+    return [url async for url in iter_eater_links(start_url, max_articles, fetcher, prefetch, state)]
+
+def get_eater_links(start_url, max_articles=5, fetcher=None, state=None):  # Limit to 5 articles for testing
+    return _run(get_eater_links_async, start_url, max_articles, fetcher=fetcher, state=state)
+
+async def extract_eater_restaurants_async(url, processed_urls, fetcher=None, state=None):
+    return await extract_source_restaurants_async(EaterSource(), url, processed_urls, fetcher, state)
+
+def extract_eater_restaurants(url, processed_urls, fetcher=None, state=None):
+    return _run(extract_eater_restaurants_async, url, processed_urls, fetcher=fetcher, state=state)
+
+async def iter_infatuation_links(start_url, max_articles=5, fetcher=None, prefetch=4, state=None):
+    source = InfatuationSource(start_url=start_url, base_url=_site_origin(start_url))
+    async for url in iter_source_links(source, max_articles, fetcher, prefetch, state):
+        yield url
+
+async def get_infatuation_links_async(start_url, max_articles=5, fetcher=None, prefetch=4, state=None):
+    return [url async for url in iter_infatuation_links(start_url, max_articles, fetcher, prefetch, state)]
+
+def get_infatuation_links(start_url, max_articles=5, fetcher=None, state=None):
+    return _run(get_infatuation_links_async, start_url, max_articles, fetcher=fetcher, state=state)
+
+async def extract_infatuation_restaurants_async(url, processed_urls, fetcher=None, state=None):
+    return await extract_source_restaurants_async(InfatuationSource(), url, processed_urls, fetcher, state)
+
+def extract_infatuation_restaurants(url, processed_urls, fetcher=None, state=None):
+    return _run(extract_infatuation_restaurants_async, url, processed_urls, fetcher=fetcher, state=state)
+
+PUBLIC_SUFFIXES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public_suffixes.txt')
+
+UNWANTED_EMAIL_DOMAINS = frozenset({
+    'domain.com', 'latofonts.com', 'wixpress.com', 'example.com',
+    'yourdomain.com', 'placeholder.com', 'email.com', 'sentry.wixpress.com', 'sentry-next.wixpress.com',
+})
+UNWANTED_EMAIL_LOCAL_PARTS = frozenset({
+    'user', 'team', 'noreply', 'no-reply', 'support', 'admin', 'webmaster', 'test', 'example',
+})
+UNWANTED_EMAILS = frozenset({'info@mysite.com'})
+# Asset names such as logo@2x.png look like addresses
+ASSET_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'avif', 'ico', 'js', 'css', 'json', 'pdf'})
+
+EMAIL_LOCAL_TAIL = re.compile(r'[A-Za-z0-9._%+-]{1,64}$')
+EMAIL_DOMAIN_HEAD = re.compile(r'[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+')
+EMAIL_FORMAT = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+FIVE_DIGITS = re.compile(r'\d{5,}')
+# TLDs common enough to split lowercase text glued onto them ("comcontact")
+COMMON_TLDS = ('com', 'net', 'org', 'edu', 'gov', 'info', 'biz', 'us', 'co', 'io', 'mx', 'ca', 'uk')
+CAMEL_BOUNDARY = re.compile(r'(?<=.)[A-Z](?=[a-z])')
+# A phone number glued onto the front of an address ("214.828.2916info")
+GLUED_PHONE_PREFIX = re.compile(r'^.*\d{3}[.-]?\d{4}(?=[A-Za-z])')
+# A capitalised word glued onto a common local part ("Visitinfo", "Emailreservations")
+COMMON_LOCAL_PARTS = (
+    'info', 'hello', 'hi', 'hola', 'contact', 'events', 'event', 'catering', 'reservations', 'reservation',
+    'bookings', 'booking', 'book', 'orders', 'order', 'office', 'press', 'media', 'marketing', 'sales',
+    'jobs', 'careers', 'manager', 'management', 'general', 'eat', 'parties', 'party', 'privateevents',
+)
+GLUED_WORD_PREFIX = re.compile(r'^[A-Z][A-Za-z]*?(?=(?:%s)$)' % '|'.join(COMMON_LOCAL_PARTS))
+# Obfuscated addresses ("events [at] bistro [dot] com") are found from their [at] token
+OBFUSCATED_AT = re.compile(r'[\[\(\{]\s*at\s*[\]\)\}]', re.IGNORECASE)
+OBFUSCATED_LOCAL = re.compile(r'([A-Za-z0-9._%+-]{1,64})\s*$')
+OBFUSCATED_DOMAIN = re.compile(r'\s*([A-Za-z0-9-]+(?:\s*(?:[\[\(\{]\s*dot\s*[\]\)\}]|\.)\s*[A-Za-z0-9-]+)+)', re.IGNORECASE)
+OBFUSCATED_DOT = re.compile(r'\s*[\[\(\{]\s*dot\s*[\]\)\}]\s*|\s*\.\s*', re.IGNORECASE)
+CFEMAIL_ATTRIBUTE = re.compile(r'data-cfemail="([0-9a-fA-F]+)"')
+
+@functools.lru_cache(maxsize=None)
+def public_suffix_rules(path=PUBLIC_SUFFIXES_PATH):
+    """The ICANN public suffix rules shipped with the scraper, as a frozenset."""
+    with open(path) as f:
+        return frozenset(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+@functools.lru_cache(maxsize=None)
+def known_tlds():
+    return frozenset(rule.rsplit('.', 1)[-1].lstrip('*!') for rule in public_suffix_rules())
+
+def _trim_email_domain(domain):
+    """Cut words glued onto the end of an email domain (site.comContact -> site.com).
+
+    Returns the cleaned domain, or None if no valid top-level domain can be found.
+    """
+    tlds = known_tlds()
+    labels = domain.split('.')
+    last = labels[-1]
+    # A capitalised word starting inside the last label, e.g. "MXSunday"
+    boundary = CAMEL_BOUNDARY.search(last)
+    if boundary and last[:boundary.start()].lower() in tlds:
+        return '.'.join(labels[:-1] + [last[:boundary.start()]])
+    # A capitalised word after a final dot, e.g. "site.com.Contact"
+    if len(labels) > 2 and last[:1].isupper() and last[1:].islower() and labels[-2].lower() in tlds:
+        return '.'.join(labels[:-1])
+    if last.lower() in tlds:
+        return domain
+    # Lowercase text glued onto a common TLD, e.g. "comcontact"
+    for tld in COMMON_TLDS:
+        if last.lower().startswith(tld) and len(last) - len(tld) >= 3:
+            return '.'.join(labels[:-1] + [last[:len(tld)]])
+    return None
+
+def _trim_email_local(local):
+    """Cut a phone number or capitalised word glued onto the front of an email local part."""
+    local = GLUED_PHONE_PREFIX.sub('', local)
+    return GLUED_WORD_PREFIX.sub('', local)
+
+def decode_cfemail(encoded):
+    """Decode a Cloudflare email-protection string (hex, XOR-keyed by its first byte)."""
+    try:
+        data = bytes.fromhex(encoded)
+    except ValueError:
+        return None
+    if len(data) < 2:
+        return None
+    key = data[0]
+    try:
+        return bytes(b ^ key for b in data[1:]).decode('ascii')
+    except UnicodeDecodeError:
+        return None
+
+def _candidate_emails(text):
+    """Yield address candidates around each '@' in text, with glued-on words trimmed."""
+    position = text.find('@')
+    while position != -1:
+        local = EMAIL_LOCAL_TAIL.search(text, max(0, position - 64), position)
+        domain = EMAIL_DOMAIN_HEAD.match(text, position + 1)
+        if local and domain:
+            local_part = _trim_email_local(local.group().lstrip('.'))
+            domain_part = _trim_email_domain(domain.group().rstrip('.-'))
+            if local_part and domain_part:
+                yield f"{local_part}@{domain_part}"
+            position = text.find('@', domain.end())
+        else:
+            position = text.find('@', position + 1)
 
 def extract_emails(text):
-    """Extract and return valid email addresses from text."""
-    # Use regex to find all potential emails within the text
-    # This pattern matches sequences containing '@', allowing preceding and following characters
-    potential_emails = re.findall(r'\S+@\S+', text)
-
+    """Extract and return valid email addresses from text, including [at]/[dot] obfuscated ones."""
     valid_emails = set()
-    for email in potential_emails:
-        # Clean up the email by removing any non-email characters at the start and end
-        email = re.sub(r'^[^\w]+', '', email)  # Remove non-word characters at the start
-        email = re.sub(r'[^\w]+$', '', email)  # Remove non-word characters at the end
-        # Extract the actual email from any concatenated text
-        match = re.search(r'[\w\.-]+@[\w\.-]+\.\w{2,}', email)
-        if match:
-            email = match.group(0)
+    if '@' in text:
+        for email in _candidate_emails(text):
+            if is_valid_email(email):
+                valid_emails.add(email)
+    for match in OBFUSCATED_AT.finditer(text):
+        local = OBFUSCATED_LOCAL.search(text, max(0, match.start() - 80), match.start())
+        domain = OBFUSCATED_DOMAIN.match(text, match.end())
+        if local and domain:
+            email = f"{local.group(1)}@{OBFUSCATED_DOT.sub('.', domain.group(1))}"
             if is_valid_email(email):
                 valid_emails.add(email)
     return valid_emails
 
+def extract_page_emails(page, html_content):
+    """Extract emails from a parsed page: its text, mailto: links and Cloudflare-protected addresses."""
+    emails = extract_emails(page.text)
+    for href in page.hrefs:
+        if href[:7].lower() == 'mailto:':
+            for address in unquote(href[7:].split('?', 1)[0]).split(','):
+                emails |= extract_emails(address.strip())
+        elif '/cdn-cgi/l/email-protection#' in href:
+            decoded = decode_cfemail(href.rsplit('#', 1)[1])
+            if decoded:
+                emails |= extract_emails(decoded)
+    if 'data-cfemail' in html_content:
+        for encoded in CFEMAIL_ATTRIBUTE.findall(html_content):
+            decoded = decode_cfemail(encoded)
+            if decoded:
+                emails |= extract_emails(decoded)
+    return emails
+
 def is_valid_email(email):
     """Validate email addresses based on custom rules."""
-    # Exclude emails with unwanted domains
-    unwanted_domains = [
-        'domain.com', 'latofonts.com', 'wixpress.com', 'example.com',
-        'yourdomain.com', 'placeholder.com', 'email.com', 'sentry.wixpress.com', 'sentry-next.wixpress.com'
-    ]
-    # Exclude emails with unwanted prefixes
-    unwanted_prefixes = [
-        'user@', 'team@', 'info@mysite.com', 'noreply@', 'no-reply@',
-        'support@', 'admin@', 'webmaster@', 'test@', 'example@'
-    ]
-
-    email_lower = email.lower()
-    domain = email_lower.split('@')[-1]
-
-    # Check for unwanted domains
-    if domain in unwanted_domains:
+    # Exclude emails that are too long or too short
+    if not (5 <= len(email) <= 254):
         return False
 
-    # Check for unwanted prefixes
-    if any(email_lower.startswith(prefix) for prefix in unwanted_prefixes):
+    # Exclude emails with non-ASCII characters
+    if not email.isascii():
         return False
 
-    # Exclude emails that are too long or too short
-    if not (5 <= len(email) <= 254):
+    # Basic email format validation
+    if not EMAIL_FORMAT.fullmatch(email):
         return False
 
-    # Exclude emails with non-ASCII characters
-    if not all(ord(c) < 128 for c in email):
+    email_lower = email.lower()
+    local_part, domain = email_lower.rsplit('@', 1)
+
+    # Exclude unwanted domains, prefixes and addresses
+    if domain in UNWANTED_EMAIL_DOMAINS or local_part in UNWANTED_EMAIL_LOCAL_PARTS or email_lower in UNWANTED_EMAILS:
         return False
 
-    # Exclude emails with consecutive digits (e.g., phone numbers)
-    if re.search(r'\d{5,}', email):
+    # Require a real top-level domain, and skip asset names like logo@2x.png
+    tld = domain.rsplit('.', 1)[-1]
+    if tld in ASSET_EXTENSIONS or tld not in known_tlds():
         return False
 
-    # Basic email format validation
-    email_regex = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
-    if not re.match(email_regex, email):
+    # Exclude emails with consecutive digits (e.g., phone numbers)
+    if FIVE_DIGITS.search(email):
         return False
 
     return True
 
-def scrape_emails_and_platforms_from_website(url, max_links=5):
+# Keywords that mark pages likely to carry a contact email or booking widget.
+# A link scores the sum of the keywords found in its path or anchor text.
+LINK_KEYWORDS = (
+    ('contact', 10), ('private dining', 8), ('private event', 8), ('event', 6),
+    ('catering', 6), ('about', 6), ('reserv', 5), ('book', 4), ('info', 3),
+    ('press', 3), ('location', 3), ('visit', 3), ('hours', 2), ('team', 2),
+    ('gallery', -4), ('photo', -4), ('blog', -3), ('shop', -3), ('cart', -5),
+    ('login', -5), ('account', -5), ('privacy', -6), ('terms', -6),
+)
+FOOTER_LINK_BONUS = 3  # Footers usually hold the contact and events links
+SKIPPED_LINK_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.mp4', '.zip', '.ics', '.xml')
+SITEMAP_LOC = re.compile(r'<loc>\s*(?:<!\[CDATA\[)?\s*([^<\]\s]+)', re.IGNORECASE)
+SITEMAP_MAX_URLS = 500
+STRONG_LINK_SCORE = 6  # contact/about/events-like pages; below this /sitemap.xml is consulted
+SITE_WAVE_SIZE = 2  # Weak candidates fetched per wave; the scrape can stop between waves
+
+def _keyword_score(text):
+    text = text.lower().replace('-', ' ').replace('_', ' ')
+    return sum(weight for keyword, weight in LINK_KEYWORDS if keyword in text)
+
+def score_link(path, anchor_text='', in_footer=False):
+    """Rank a same-site link by how likely it is to lead to an email or booking platform."""
+    if path.lower().endswith(SKIPPED_LINK_EXTENSIONS):
+        return None
+    score = _keyword_score(path) + _keyword_score(anchor_text)
+    if in_footer:
+        score += FOOTER_LINK_BONUS
+    # Deep pages (menus/items/..., blog/2023/...) rarely hold contact details
+    score -= max(0, path.strip('/').count('/') - 1)
+    return score
+
+def sitemap_urls(xml_text):
+    """Page URLs listed in a sitemap, skipping nested sitemap files."""
+    urls = []
+    for match in SITEMAP_LOC.finditer(xml_text):
+        loc = match.group(1)
+        if not loc.lower().endswith(('.xml', '.xml.gz')):
+            urls.append(loc)
+            if len(urls) >= SITEMAP_MAX_URLS:
+                break
+    return urls
+
+async def scrape_emails_and_platforms_from_website_async(url, max_links=5, fetcher=None, raise_errors=False):
+    """Scrape a restaurant website for emails and platforms.
+
+    Same-site links are fetched best-first by score_link(), /sitemap.xml is
+    consulted when the home page links nowhere promising, and the scrape stops
+    as soon as an email and a platform have been found. max_links caps the
+    total number of requests, the home page and sitemap included.
+    With `raise_errors`, a home page that cannot be fetched raises instead of
+    giving an empty result, so the caller can retry it.
+    """
+    fetcher = fetcher or AsyncFetcher()
+    matcher = load_signature_matcher()
     emails = set()
     visited_links = set()  # Track visited links to avoid duplicates
-    pos_systems = set()
-    reservation_platforms = set()
+    platforms = {category: set() for category in PLATFORM_LABELS}
     reservation_links = set()
 
-    # Define patterns for POS systems and reservation platforms
-    pos_patterns = {
-        'Toast': re.compile(r'toasttab\.com'),
-        'Square': re.compile(r'squareup\.com|square\.site'),
-        'Clover': re.compile(r'clover\.com'),
-        'ShopKeep': re.compile(r'shopkeep\.com'),
-        'Revel Systems': re.compile(r'revelsystems\.com'),
-        'Upserve': re.compile(r'upserve\.com'),
-        'TouchBistro': re.compile(r'touchbistro\.com'),
-        'Lightspeed': re.compile(r'lightspeedhq\.com'),
-        # Add more POS systems as needed
-    }
-
-    reservation_patterns = {
-        'OpenTable': re.compile(r'opentable\.com'),
-        'Resy': re.compile(r'resy\.com'),
-        'Tock': re.compile(r'exploretock\.com'),
-        'Yelp Reservations': re.compile(r'yelp\.com/reservations'),
-        'SevenRooms': re.compile(r'sevenrooms\.com'),
-        # Add more reservation platforms as needed
-    }
-
-    print(f"\nScraping emails and platforms from website: {url}")
+    def scan_page(html_content, hrefs, where):
+        # Search for POS, ordering and reservation platforms in the HTML content
+        for category, name in sorted(matcher.search(html_content)):
+            if name not in platforms[category]:
+                platforms[category].add(name)
+                logger.debug("Found %s '%s' on %s.", PLATFORM_LABELS[category], name, where)
+
+        # Collect reservation links
+        for href in hrefs:
+            for category, name in matcher.search(href):
+                if category == 'reservation' and href not in reservation_links:
+                    reservation_links.add(href)
+                    logger.debug("Found reservation link '%s' for platform '%s' on %s.", href, name, where)
+
+    async def fetch_page(page_url):
+        page_response = await fetcher.fetch(page_url)
+        page_response.raise_for_status()
+        return page_response
+
+    def result():
+        return emails, platforms['pos'], platforms['ordering'], platforms['reservation'], reservation_links
+
+    def satisfied():
+        return emails and any(platforms.values())
+
+    logger.info("Scraping emails and platforms from website: %s", url)
     try:
         url_normalized = normalize_url(url)
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        text = soup.get_text()
-        html_content = response.text
+        site = urlparse(url_normalized).netloc
+        response = await fetch_page(url)
+        page = parse_page(response.content)
 
         # Extract emails
-        new_emails = extract_emails(text)
+        new_emails = extract_page_emails(page, response.text)
         emails.update(new_emails)
         if new_emails:
-            print(f"Found emails on main page: {new_emails}")
-
-        # Search for POS systems and reservation platforms in HTML content
-        for name, pattern in pos_patterns.items():
-            if pattern.search(html_content):
-                pos_systems.add(name)
-                print(f"Found POS system '{name}' on main page.")
-
-        for name, pattern in reservation_patterns.items():
-            if pattern.search(html_content):
-                reservation_platforms.add(name)
-                print(f"Found reservation platform '{name}' on main page.")
+            logger.debug("Found emails on main page: %s", new_emails)
 
-        # Collect reservation links
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            for name, pattern in reservation_patterns.items():
-                if pattern.search(href):
-                    reservation_links.add(href)
-                    print(f"Found reservation link '{href}' for platform '{name}'.")
+        scan_page(response.text, page.hrefs, 'main page')
+        requests_made = 1
+        if satisfied():
+            return result()
 
         visited_links.add(url_normalized)
-        # Check for links to other pages and scrape them up to max_links
-        links_scraped = 1
-        for link in soup.find_all('a', href=True):
-            if links_scraped >= max_links:
-                break
-            href = link['href']
-            if 'tel:' in href:
-                print(f"Skipping telephone link: {href}")
-                continue  # Skip links with 'tel:'
-            absolute_link = urljoin(url, href)
+        # Score same-domain links to other pages; ties keep document order
+        candidates = []
+
+        def add_candidate(absolute_link, anchor_text='', in_footer=False):
             absolute_link_normalized = normalize_url(absolute_link)
             parsed_link = urlparse(absolute_link_normalized)
-
             # Only follow links within the same domain
-            if parsed_link.netloc == urlparse(url_normalized).netloc and absolute_link_normalized not in visited_links:
-                try:
-                    link_response = requests.get(absolute_link, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-                    link_response.raise_for_status()
-                    link_text = link_response.text
-                    link_soup = BeautifulSoup(link_response.content, 'html.parser')
-                    link_text_content = link_soup.get_text()
-
-                    # Extract emails
-                    new_emails = extract_emails(link_text_content)
-                    if new_emails:
-                        emails.update(new_emails)
-                        print(f"Found emails on page {absolute_link}: {new_emails}")
-
-                    # Search for POS systems and reservation platforms
-                    for name, pattern in pos_patterns.items():
-                        if pattern.search(link_text):
-                            pos_systems.add(name)
-                            print(f"Found POS system '{name}' on page {absolute_link}.")
-
-                    for name, pattern in reservation_patterns.items():
-                        if pattern.search(link_text):
-                            reservation_platforms.add(name)
-                            print(f"Found reservation platform '{name}' on page {absolute_link}.")
-
-                    # Collect reservation links
-                    for a_tag in link_soup.find_all('a', href=True):
-                        link_href = a_tag['href']
-                        for name, pattern in reservation_patterns.items():
-                            if pattern.search(link_href):
-                                reservation_links.add(link_href)
-                                print(f"Found reservation link '{link_href}' for platform '{name}' on page {absolute_link}.")
-
-                    visited_links.add(absolute_link_normalized)
-                    links_scraped += 1
-                    time.sleep(1)  # Be polite and avoid overwhelming the server
-                except requests.RequestException:
+            if parsed_link.netloc != site or absolute_link_normalized in visited_links:
+                return
+            score = score_link(parsed_link.path, anchor_text, in_footer)
+            if score is not None:
+                visited_links.add(absolute_link_normalized)
+                candidates.append((score, len(candidates), absolute_link))
+
+        for anchor in page.anchors:
+            href = anchor['href']
+            if 'tel:' in href:
+                logger.debug("Skipping telephone link: %s", href)
+                continue  # Skip links with 'tel:'
+            add_candidate(urljoin(url, href), anchor.get_text(' ', strip=True),
+                          anchor.find_parent('footer') is not None)
+
+        # Fall back to the sitemap when the home page has no contact-like links
+        if requests_made < max_links and max((c[0] for c in candidates), default=0) < STRONG_LINK_SCORE:
+            requests_made += 1
+            try:
+                sitemap = await fetch_page(urljoin(url_normalized, '/sitemap.xml'))
+            except requests.RequestException:
+                sitemap = None
+            if sitemap is not None:
+                before = len(candidates)
+                for loc in sitemap_urls(sitemap.text):
+                    add_candidate(loc)
+                # Only keep sitemap entries that look relevant
+                candidates[before:] = [c for c in candidates[before:] if c[0] > 0]
+                if len(candidates) > before:
+                    logger.debug("Found %d candidate pages in the sitemap of %s.", len(candidates) - before, url)
+
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        candidate_links = deque(candidates)
+        # Fetch the best candidates in small waves, stopping as soon as the
+        # scrape is satisfied or the request budget is spent
+        while candidate_links and requests_made < max_links and not satisfied():
+            if emails:
+                # With an email in hand, only pages likely to embed a platform are worth a request
+                while candidate_links and candidate_links[0][0] <= 0:
+                    candidate_links.popleft()
+            # A strong candidate is fetched on its own since it will likely satisfy the scrape
+            wave_size = 1 if candidate_links and candidate_links[0][0] >= STRONG_LINK_SCORE else SITE_WAVE_SIZE
+            batch = [candidate_links.popleft()[2]
+                     for _ in range(min(wave_size, max_links - requests_made, len(candidate_links)))]
+            if not batch:
+                break
+            requests_made += len(batch)
+            results = await asyncio.gather(*(fetch_page(link) for link in batch), return_exceptions=True)
+            for absolute_link, link_response in zip(batch, results):
+                if isinstance(link_response, requests.RequestException):
                     continue
+                if isinstance(link_response, BaseException):
+                    raise link_response
+                link_page = parse_page(link_response.content)
+
+                # Extract emails
+                new_emails = extract_page_emails(link_page, link_response.text)
+                if new_emails:
+                    emails.update(new_emails)
+                    logger.debug("Found emails on page %s: %s", absolute_link, new_emails)
 
-        return emails, pos_systems, reservation_platforms, reservation_links
+                scan_page(link_response.text, link_page.hrefs, f'page {absolute_link}')
+
+        return result()
 
     except requests.RequestException as e:
-        print(f"Error scraping {url}: {e}")
-        return emails, pos_systems, reservation_platforms, reservation_links
-
-def update_with_emails_and_platforms(df, max_websites=50):
-    print("\nStarting to extract emails and platforms from restaurant websites.")
-    emails_list = []
-    pos_list = []
-    reservation_list = []
-    reservation_links_list = []
-    processed_websites = set()  # Track processed websites
-    websites_processed_count = 0  # Counter for unique websites processed
-    for index, row in df.iterrows():
-        if websites_processed_count >= max_websites:
-            print(f"Reached the maximum number of websites ({max_websites}). Stopping extraction.")
-            # Append None for the remaining restaurants
-            remaining = len(df) - len(emails_list)
-            emails_list.extend([None] * remaining)
-            pos_list.extend([None] * remaining)
-            reservation_list.extend([None] * remaining)
-            reservation_links_list.extend([None] * remaining)
+        if raise_errors:
+            raise
+        logger.warning("Error scraping %s: %s", url, e)
+        return result()
+
+def scrape_emails_and_platforms_from_website(url, max_links=5, fetcher=None):
+    return _run(scrape_emails_and_platforms_from_website_async, url, max_links, fetcher=fetcher)
+
+# Hosts where many unrelated businesses live under one registrable domain;
+# their entity key keeps the host and first path segment instead
+SHARED_HOST_DOMAINS = frozenset({
+    'facebook.com', 'instagram.com', 'linktr.ee', 'wixsite.com', 'squarespace.com', 'square.site',
+    'business.site', 'godaddysites.com', 'weebly.com', 'wordpress.com', 'toasttab.com',
+    'yelp.com', 'google.com', 'resy.com', 'opentable.com', 'exploretock.com', 'order.online',
+})
+DEFAULT_COUNTRY_CODE = '1'  # Phones without a country code are assumed to be North American
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr',
+    'lane': 'ln', 'parkway': 'pkwy', 'highway': 'hwy', 'freeway': 'fwy', 'expressway': 'expy',
+    'place': 'pl', 'court': 'ct', 'circle': 'cir', 'square': 'sq', 'terrace': 'ter', 'trail': 'trl',
+    'suite': 'ste', 'building': 'bldg', 'floor': 'fl', 'north': 'n', 'south': 's', 'east': 'e',
+    'west': 'w', 'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+ADDRESS_DROPPED_TOKENS = frozenset({'usa', 'us', 'united', 'states'})
+ZIP_PLUS_FOUR = re.compile(r'\b(\d{5})-\d{4}\b')
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+MAX_BLOCK_SIZE = 50  # Keys shared by more rows than this are too generic to block on
+
+def registrable_domain(host):
+    """The registrable domain of a host (www.bistro.co.uk -> bistro.co.uk) per the public suffix rules."""
+    host = host.lower().strip('.')
+    if host.startswith('[') or host.replace('.', '').isdigit():
+        return host  # IP address
+    rules = public_suffix_rules()
+    labels = host.split('.')
+    suffix_length = 1  # Unlisted TLDs are treated as a public suffix
+    for i in range(len(labels)):
+        candidate = '.'.join(labels[i:])
+        if '!' + candidate in rules:
+            suffix_length = len(labels) - i - 1
+            break
+        if candidate in rules or '*.' + '.'.join(labels[i + 1:]) in rules:
+            suffix_length = len(labels) - i
             break
-        print(f"\nProcessing restaurant {index + 1}/{len(df)}: {row['Name']}")
-        website = row['Website']
-        if pd.notnull(website):
-            website_normalized = normalize_url(website)
-            if website_normalized in processed_websites:
-                print(f"Website already processed: {website}")
-                emails_list.append(None)
-                pos_list.append(None)
-                reservation_list.append(None)
-                reservation_links_list.append(None)
+    if len(labels) <= suffix_length:
+        return host
+    return '.'.join(labels[-suffix_length - 1:])
+
+def website_key(url):
+    """Entity key for a website: its registrable domain, or host plus first path segment on shared hosts."""
+    if not url:
+        return None
+    parsed = urlparse(url if '//' in url else '//' + url)
+    if not parsed.hostname:
+        return None
+    domain = registrable_domain(parsed.hostname)
+    if domain in SHARED_HOST_DOMAINS:
+        host = parsed.hostname.lower()
+        host = host[4:] if host.startswith('www.') else host
+        segment = parsed.path.strip('/').split('/', 1)[0].lower()
+        return f"{host}/{segment}" if segment else None
+    return domain
+
+def e164_phone(phone):
+    """Format a phone number as E.164 (+12145550101), or None if it does not look like one."""
+    if not phone:
+        return None
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if phone.lstrip().startswith('+'):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f"+{DEFAULT_COUNTRY_CODE}{digits}"
+    if len(digits) == 11 and digits.startswith(DEFAULT_COUNTRY_CODE):
+        return f"+{digits}"
+    return None
+
+def canonical_address(address):
+    """Lowercase an address, drop punctuation and ZIP+4 extensions, and abbreviate street words."""
+    if not address:
+        return None
+    address = ZIP_PLUS_FOUR.sub(r'\1', address.lower()).replace('#', ' ste ')
+    tokens = [ADDRESS_ABBREVIATIONS.get(token, token) for token in NON_ALPHANUMERIC.split(address)
+              if token and token not in ADDRESS_DROPPED_TOKENS]
+    return ' '.join(tokens) or None
+
+def street_key(address):
+    """The canonical street line of an address, i.e. the part before the first comma."""
+    if not address:
+        return None
+    return canonical_address(address.split(',', 1)[0])
+
+def normalize_name(name):
+    """Fold accents, case, '&' and punctuation out of a restaurant name, and drop a leading 'the'."""
+    if not name:
+        return None
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+    name = name.replace('&', ' and ').replace("'", '').replace('\u2019', '')
+    tokens = NON_ALPHANUMERIC.sub(' ', name).split()
+    if len(tokens) > 1 and tokens[0] == 'the':
+        tokens = tokens[1:]
+    return ' '.join(tokens) or None
+
+def names_match(name_a, name_b, tokens_a=None, tokens_b=None):
+    """Whether two normalized names can be one restaurant: equal, or one's words all among the other's."""
+    if name_a == name_b:
+        return True
+    if tokens_a is None:
+        tokens_a = frozenset(name_a.split()) if name_a else frozenset()
+    if tokens_b is None:
+        tokens_b = frozenset(name_b.split()) if name_b else frozenset()
+    shorter, longer = sorted((tokens_a, tokens_b), key=len)
+    return bool(shorter) and shorter <= longer
+
+class EntityIndex:
+    """Resolve restaurant rows to entities with blocking indexes and union-find.
+
+    Each row is indexed under its website key, E.164 phone, street line and
+    normalized name, and only compared with rows sharing one of those keys,
+    so resolution stays near-linear. Two rows merge when their names are
+    compatible (equal, or one's words contain the other's) and their clusters'
+    phones and street lines do not conflict; a domain conflict only blocks the
+    merge when neither phone nor street agrees. Rows on one domain under
+    different names (a restaurant group's concepts) stay separate.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.keys = []
+        self.parent = []
+        self.clusters = {}  # root -> the domains, phones and streets of its rows
+        self.blocks = {}
+
+    @staticmethod
+    def entity_keys(row):
+        name = normalize_name(row.get('Name'))
+        return {
+            'name': name,
+            'name_tokens': frozenset(name.split()) if name else frozenset(),
+            'domain': website_key(row.get('Website')),
+            'phone': e164_phone(row.get('Phone')),
+            'street': street_key(row.get('Address')),
+        }
+
+    def _find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    @staticmethod
+    def _names_match(a, b):
+        return names_match(a['name'], b['name'], a['name_tokens'], b['name_tokens'])
+
+    def _compatible(self, root_a, root_b):
+        # Checked against whole clusters so a row missing a field cannot
+        # bridge two locations that differ on it
+        a, b = self.clusters[root_a], self.clusters[root_b]
+        for field in ('phone', 'street'):
+            if a[field] and b[field] and a[field].isdisjoint(b[field]):
+                return False
+        strong = not a['phone'].isdisjoint(b['phone']) or not a['street'].isdisjoint(b['street'])
+        return strong or not (a['domain'] and b['domain'] and a['domain'].isdisjoint(b['domain']))
+
+    def _union(self, root_a, root_b):
+        # The earlier row stays the root so output order is first-seen order
+        if root_b < root_a:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        for field, values in self.clusters.pop(root_b).items():
+            self.clusters[root_a][field] |= values
+        return root_a
+
+    def add(self, row):
+        index = len(self.rows)
+        keys = self.entity_keys(row)
+        self.rows.append(row)
+        self.keys.append(keys)
+        self.parent.append(index)
+        self.clusters[index] = {field: {keys[field]} if keys[field] else set() for field in ('domain', 'phone', 'street')}
+        root = index
+        for field in ('domain', 'phone', 'street', 'name'):
+            if not keys[field]:
                 continue
-            emails, pos_systems, reservation_platforms, reservation_links = scrape_emails_and_platforms_from_website(website)
-            emails_list.append(', '.join(emails) if emails else None)
-            pos_list.append(', '.join(pos_systems) if pos_systems else None)
-            reservation_list.append(', '.join(reservation_platforms) if reservation_platforms else None)
-            reservation_links_list.append(', '.join(reservation_links) if reservation_links else None)
-            print(f"Extracted emails from {website}: {emails}")
-            print(f"Detected POS systems: {pos_systems}")
-            print(f"Detected reservation platforms: {reservation_platforms}")
-            print(f"Collected reservation links: {reservation_links}")
-            processed_websites.add(website_normalized)
-            websites_processed_count += 1
-        else:
-            emails_list.append(None)
-            pos_list.append(None)
-            reservation_list.append(None)
-            reservation_links_list.append(None)
-            print(f"No website URL for {row['Name']}")
-    df['Emails'] = emails_list
-    df['POS Systems'] = pos_list
-    df['Reservation Platforms'] = reservation_list
-    df['Reservation Links'] = reservation_links_list
-    print("Finished extracting emails and platforms.")
-    return df
-
-def save_to_csv(df, filename='restaurants.csv'):
-    df.to_csv(filename, index=False)
-    print(f"\nData saved to {filename}")
-
-def save_hubspot_upload_csv(df, filename='restaurants_hubspot_upload.csv'):
-    # Split the 'Emails' column into multiple rows
-    df_exploded = df.copy()
-    df_exploded['Emails'] = df_exploded['Emails'].str.split(', ')
-    df_exploded = df_exploded.explode('Emails')
-    df_exploded.to_csv(filename, index=False)
-    print(f"\nData saved to {filename} with one email per row.")
-
-def main():
-    # Eater URLs
-    eater_start_url = 'https://dallas.eater.com/'
-    print("Starting to process Eater data.")
-    eater_links = get_eater_links(eater_start_url, max_articles=5)  # Limit to 5 articles for testing
-    eater_restaurants = []
+            block = self.blocks.setdefault((field, keys[field]), [])
+            if len(block) < MAX_BLOCK_SIZE:
+                for other in block:
+                    other_root = self._find(other)
+                    if other_root != root and self._names_match(keys, self.keys[other]) \
+                            and self._compatible(root, other_root):
+                        root = self._union(root, other_root)
+                block.append(index)
+        return index
+
+    def entities(self):
+        """Merged records in first-seen order; each field takes the first non-empty value of its cluster."""
+        clusters = {}
+        for index in range(len(self.rows)):
+            clusters.setdefault(self._find(index), []).append(self.rows[index])
+        for members in clusters.values():
+            merged = dict(members[0])
+            for row in members[1:]:
+                for column, value in row.items():
+                    if value and not merged.get(column):
+                        merged[column] = value
+            yield merged
+
+ENRICHMENT_COLUMNS = ['Emails', 'POS Systems', 'Ordering Platforms', 'Reservation Platforms', 'Reservation Links']
+OUTPUT_COLUMNS = ['Name', 'Address', 'Phone', 'Website', 'Latitude', 'Longitude', 'Cuisine'] + ENRICHMENT_COLUMNS
+
+async def ordered_map(items, fn, window):
+    """Apply async fn to an async iterable with up to `window` calls in flight, yielding results in input order."""
+    pending = deque()
+    try:
+        async for item in items:
+            pending.append(asyncio.ensure_future(fn(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def merge_async(iterators):
+    """Interleave several async iterators, yielding items as soon as any of them produces one."""
+    queue = asyncio.Queue(maxsize=len(iterators))
+    done = object()
+
+    async def drain(iterator):
+        try:
+            async for item in iterator:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            await queue.put((done, None))
+
+    tasks = [asyncio.ensure_future(drain(iterator)) for iterator in iterators]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+DISCOVERY_MODES = ('crawl', 'feeds', 'auto')
+
+async def discover_articles(fetcher, state=None, max_articles=5, discovery='crawl', sources=None):
+    """Stage 1: discover every source's articles side by side, yielding (source, article URL) pairs.
+
+    `discovery` is 'crawl' (follow links page by page), 'feeds' (sitemaps and
+    RSS/Atom only) or 'auto' (feeds, crawling any source they find nothing for).
+    """
+    async def source_articles(source):
+        found = 0
+        if discovery != 'crawl':
+            async for url in iter_feed_links(source, max_articles, fetcher=fetcher, state=state):
+                found += 1
+                yield source, url
+        if discovery == 'crawl' or (discovery == 'auto' and not found):
+            async for url in iter_source_links(source, max_articles, fetcher=fetcher, state=state):
+                yield source, url
+        if state is not None and state.incremental:
+            # Reuse the restaurants of articles extracted by earlier runs
+            since = (datetime.now() - timedelta(days=547.5)).timestamp()
+            for url in state.previous_articles(source.name, since):
+                yield source, url
+
+    sources = sources if sources is not None else market_sources()
+    async for article in merge_async([source_articles(source) for source in sources]):
+        yield article
+
+async def extract_restaurants(articles, fetcher, state=None, window=4):
+    """Stage 2: extract restaurants from each article, a few articles at a time."""
     processed_urls = set()
-    for link in eater_links:
-        eater_restaurants.extend(extract_eater_restaurants(link, processed_urls))
-        time.sleep(1)  # Be polite
-
-    print(f"\nExtracted total {len(eater_restaurants)} restaurants from Eater.")
-
-    # Infatuation URLs
-    infatuation_start_url = 'https://www.theinfatuation.com/dallas/guides'
-    print("\nStarting to process The Infatuation data.")
-    infatuation_links = get_infatuation_links(infatuation_start_url, max_articles=5)  # Limit to 5 articles for testing
-    infatuation_restaurants = []
-    for link in infatuation_links:
-        infatuation_restaurants.extend(extract_infatuation_restaurants(link, processed_urls))
-        time.sleep(1)  # Be polite
-
-    print(f"\nExtracted total {len(infatuation_restaurants)} restaurants from The Infatuation.")
 
-    # Combine and deduplicate
-    combined_df = combine_and_deduplicate(eater_restaurants, infatuation_restaurants)
-
-    # Extract emails and platforms (limited to 50 unique restaurant websites)
-    combined_df = update_with_emails_and_platforms(combined_df, max_websites=50)
-
-    # Save to CSV
-    save_to_csv(combined_df)
+    async def extract(article):
+        source, url = article
+        return await extract_source_restaurants_async(source, url, processed_urls, fetcher=fetcher, state=state)
+
+    async for restaurants in ordered_map(articles, extract, window):
+        for restaurant in restaurants:
+            yield restaurant
+
+async def resolve_entities(restaurants):
+    """Stage 3: merge rows describing the same restaurant and drop article-title rows.
+
+    This is the one stage that buffers. A restaurant's phone, website or
+    address can first appear in any later article, so no entity is final
+    until extraction ends. What it holds is the extracted rows, a few
+    hundred bytes each, in EntityIndex; article pages are still streamed
+    and dropped as they are parsed. Enrichment and the sink start once
+    extraction is done.
+    """
+    index = EntityIndex()
+    total = 0
+    title_only = 0
+    async for restaurant in restaurants:
+        total += 1
+        # Rows with just a name are article titles or intro cards, not restaurants
+        if not (restaurant.get('Address') or restaurant.get('Phone') or restaurant.get('Website')):
+            title_only += 1
+            continue
+        with metrics.timer('resolve'):
+            index.add(restaurant)
+    with metrics.timer('resolve'):
+        entities = list(index.entities())
+    for entity in entities:
+        yield entity
+    unique = len(entities)
+    logger.info("Entity resolution kept %d of %d restaurants (%d title-only rows dropped)", unique, total, title_only)
+
+def record_enrichment(website, result):
+    metrics.count('sites_enriched')
+    metrics.count('emails_found', len(result[0]))
+    metrics.count('sites_with_email', bool(result[0]))
+    metrics.count('sites_with_platform', any(result[1:4]))
+    logger.info("Extracted emails from %s: %s", website, result[0])
+    logger.debug("Detected POS systems: %s", result[1])
+    logger.debug("Detected ordering platforms: %s", result[2])
+    logger.debug("Detected reservation platforms: %s", result[3])
+    logger.debug("Collected reservation links: %s", result[4])
+
+def enrichment_fields(result):
+    emails, pos_systems, ordering_platforms, reservation_platforms, reservation_links = result
+    values = (emails, pos_systems, ordering_platforms, reservation_platforms, reservation_links)
+    return {column: ', '.join(value) if value else None for column, value in zip(ENRICHMENT_COLUMNS, values)}
+
+class EnrichmentCache:
+    """Persistent SQLite cache of website enrichment results, keyed on the site's website_key().
+
+    Restaurants sharing a domain (a group's locations, or the same place in
+    several markets and runs) reuse one result until it is older than `ttl`.
+    Results that found nothing expire after `empty_ttl` instead, since they
+    are as likely to come from a site that was down as from one without an
+    address.
+    """
+
+    def __init__(self, path='.cache/enrichment.sqlite', ttl=7 * 24 * 3600, empty_ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shared by market processes, so writes wait on each other instead of failing
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS enrichment (
+                domain TEXT PRIMARY KEY,
+                website TEXT NOT NULL,
+                result TEXT NOT NULL,
+                found INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, domain):
+        """The cached result for a domain as a (emails, pos, ordering, reservation, links) tuple, or None if stale."""
+        row = self._db.execute('SELECT result, found, fetched_at FROM enrichment WHERE domain = ?', (domain,)).fetchone()
+        if row is None or time.time() - row[2] >= (self.ttl if row[1] else self.empty_ttl):
+            return None
+        return tuple(json.loads(row[0]))
+
+    def store(self, domain, website, result, fetched_at=None):
+        """Cache a result, as of `fetched_at` (a Unix time, by default now)."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO enrichment VALUES (?, ?, ?, ?, ?)',
+            (domain, website, json.dumps([list(values) for values in result]), int(any(result)),
+             time.time() if fetched_at is None else fetched_at),
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+class WorkQueue:
+    """Durable SQLite work queue of website enrichment jobs, one per website_key().
+
+    Workers claim jobs by leasing them for `visibility_timeout` seconds. A job
+    whose worker crashed or hung becomes claimable again once its lease
+    expires, and a worker that stops cleanly releases its jobs at once.
+    Failed jobs are retried with exponential backoff. After `max_attempts`
+    they move to the dead_letters table and count as finished with no
+    result. Any number of processes, on this machine or on others sharing the
+    file over a filesystem with working locks, can work one queue. Each claim
+    and each state change is a single immediate transaction. The queue keeps
+    SQLite's rollback journal: WAL's shared-memory index only works for
+    processes on one host.
+
+    Lock waits can take up to a minute, so async code calls the methods
+    through run(), on the queue's own thread. `clock` gives the time in
+    seconds (time.time by default).
+    """
+
+    RETRY_BACKOFF = 30  # Seconds before the first retry; doubles with each attempt
+
+    def __init__(self, path='.state/enrichment_queue.sqlite', visibility_timeout=600, max_attempts=3, clock=time.time):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Only ever used by one thread at a time: the caller's, or _executor's for run()
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._db.execute('PRAGMA journal_mode=DELETE')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                website TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                enqueued_at REAL NOT NULL,
+                finished_at REAL,
+                result TEXT,
+                last_error TEXT,
+                finish_seq INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                job_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                website TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            );
+        """)
+        if 'finish_seq' not in {column[1] for column in self._db.execute('PRAGMA table_info(jobs)')}:
+            self._db.execute('ALTER TABLE jobs ADD COLUMN finish_seq INTEGER')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finish_seq)')
+
+    async def run(self, method, *args, **kwargs):
+        """Await one of the queue's methods on its own thread, leaving the event loop free while SQLite waits."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def enqueue(self, key, website, max_age=None, empty_max_age=None):
+        """Queue a site unless it is already queued, leased, or done within `max_age` seconds.
+
+        A done job whose result is empty is reused for `empty_max_age` seconds
+        instead (by default `max_age`). With no `max_age` done jobs are always
+        queued again.
+        """
+        now = self.clock()
+        with self._transaction():
+            row = self._db.execute('SELECT status, finished_at, result FROM jobs WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] == 'done' and max_age is not None:
+                found = any(json.loads(row[2]))
+                max_age = max_age if found or empty_max_age is None else empty_max_age
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO jobs (key, website, status, available_at, enqueued_at) VALUES (?, ?, 'pending', ?, ?)",
+                    (key, website, now, now),
+                )
+            elif row[0] == 'dead' or (row[0] == 'done' and (max_age is None or now - row[1] >= max_age)):
+                self._db.execute(
+                    "UPDATE jobs SET website = ?, status = 'pending', attempts = 0, available_at = ?, enqueued_at = ?, "
+                    "lease_owner = NULL, lease_expires = NULL, finished_at = NULL, result = NULL, last_error = NULL "
+                    "WHERE key = ?",
+                    (website, now, now, key),
+                )
+            else:
+                return False
+        metrics.count('queue_enqueued')
+        return True
+
+    def claim(self, worker, limit=1):
+        """Lease up to `limit` claimable jobs to a worker. Returns [(job id, key, website)]."""
+        now = self.clock()
+        claimed = []
+        with self._transaction():
+            rows = self._db.execute(
+                "SELECT id, key, website, attempts, last_error FROM jobs "
+                "WHERE (status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?) "
+                "ORDER BY available_at, id LIMIT ?",
+                (now, now, limit * 2),
+            ).fetchall()
+            for job_id, key, website, attempts, last_error in rows:
+                if attempts >= self.max_attempts:
+                    # Its last lease expired without a result, most likely a crashed worker
+                    self._bury(job_id, key, website, attempts, last_error or 'lease expired', now)
+                    continue
+                if len(claimed) == limit:
+                    break
+                self._db.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker, now + self.visibility_timeout, job_id),
+                )
+                claimed.append((job_id, key, website))
+        return claimed
+
+    def extend(self, job_ids, worker):
+        """Renew a worker's leases on jobs it is still working on."""
+        with self._transaction():
+            self._db.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                [(self.clock() + self.visibility_timeout, job_id, worker) for job_id in job_ids],
+            )
+
+    def release(self, job_ids, worker):
+        """Hand jobs a worker still holds back to the queue at once, without counting the attempt."""
+        with self._transaction():
+            self._db.executemany(
+                "UPDATE jobs SET status = 'pending', available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1 WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                [(self.clock(), job_id, worker) for job_id in job_ids],
+            )
+
+    def complete(self, job_id, result):
+        """Store a job's result. The first result wins, even from a worker whose lease has run out."""
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "finish_seq = (SELECT COALESCE(MAX(finish_seq), 0) + 1 FROM jobs) WHERE id = ? AND status != 'done'",
+                (json.dumps([list(values) for values in result]), self.clock(), job_id),
+            )
+        metrics.count('queue_completed')
+
+    def fail(self, job_id, worker, error):
+        """Release a failed job for a retry after a backoff, or dead-letter it after max_attempts."""
+        now = self.clock()
+        with self._transaction():
+            row = self._db.execute(
+                "SELECT key, website, attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, worker),
+            ).fetchone()
+            if row is None:
+                return  # Another worker took over the job
+            key, website, attempts = row
+            if attempts >= self.max_attempts:
+                self._bury(job_id, key, website, attempts, error, now)
+                metrics.count('queue_dead')
+                return
+            self._db.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = ? WHERE id = ?",
+                (now + self.RETRY_BACKOFF * 2 ** (attempts - 1), error, job_id),
+            )
+        metrics.count('queue_retried')
+
+    def _bury(self, job_id, key, website, attempts, error, now):
+        self._db.execute(
+            "UPDATE jobs SET status = 'dead', finished_at = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, "
+            "finish_seq = (SELECT COALESCE(MAX(finish_seq), 0) + 1 FROM jobs) WHERE id = ?",
+            (now, error, job_id),
+        )
+        self._db.execute('INSERT INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)', (job_id, key, website, attempts, error, now))
+        logger.warning("Gave up on %s after %d attempts: %s", website, attempts, error)
+
+    def finished(self, keys):
+        """(result, finished_at) of the given jobs that are done, or (None, finished_at) for dead ones."""
+        keys = list(keys)
+        finished = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for key, status, result, finished_at in self._db.execute(
+                f"SELECT key, status, result, finished_at FROM jobs "
+                f"WHERE key IN ({placeholders}) AND status IN ('done', 'dead')", chunk
+            ):
+                finished[key] = (tuple(json.loads(result)) if status == 'done' else None, finished_at)
+        return finished
+
+    def finish_cursor(self):
+        """The sequence number of the latest job to finish, a starting point for finished_since()."""
+        return self._db.execute('SELECT COALESCE(MAX(finish_seq), 0) FROM jobs').fetchone()[0]
+
+    def finished_since(self, cursor):
+        """Jobs that finished after `cursor`, as ({key: (result, finished_at)} like finished(), new cursor).
+
+        Each finish takes the next sequence number, so readers only look at
+        what changed since their last call, whichever host's clock set
+        finished_at.
+        """
+        finished = {}
+        for key, status, result, finished_at, cursor in self._db.execute(
+            "SELECT key, status, result, finished_at, finish_seq FROM jobs "
+            "WHERE finish_seq > ? AND status IN ('done', 'dead') ORDER BY finish_seq", (cursor,)
+        ).fetchall():
+            finished[key] = (tuple(json.loads(result)) if status == 'done' else None, finished_at)
+        return finished, cursor
+
+    def dead_letters(self):
+        """Dead-lettered jobs as (key, website, attempts, error, failed_at) tuples, oldest first."""
+        return self._db.execute(
+            'SELECT key, website, attempts, error, failed_at FROM dead_letters ORDER BY failed_at, job_id'
+        ).fetchall()
+
+    def counts(self):
+        return dict(self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def close(self):
+        self._executor.shutdown()
+        self._db.close()
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+async def run_worker(queue, fetcher, concurrency=8, worker=None, poll_interval=1.0, stop=None, on_done=None,
+                     exit_when_idle=False):
+    """Claim and scrape queued sites, `concurrency` at a time, until `stop` is set.
+
+    With `exit_when_idle` the worker also returns once nothing is pending or
+    leased. Leases are renewed while their scrapes run, and jobs still
+    running when the worker stops are released for others to claim. Errors
+    reaching the home page (connection failures, timeouts, 5xx and 429
+    responses) are retried through the queue. Other 4xx answers and
+    robots.txt disallowing the site are final and give an empty result.
+    on_done() is called after each job is finished. An offline fetcher is
+    refused: results read from the response cache would be shared as if
+    they came from the live sites.
+    """
+    if fetcher.offline:
+        raise ValueError("An offline fetcher cannot work the enrichment queue")
+    worker = worker or worker_name()
+    stop = stop or asyncio.Event()
+    running = {}  # task -> job id
+    renewed = time.monotonic()
+    logger.info("Enrichment worker %s started on %s", worker, queue.path)
+
+    async def work(job_id, website):
+        try:
+            with metrics.timer('enrich'):
+                result = await scrape_emails_and_platforms_from_website_async(website, fetcher=fetcher, raise_errors=True)
+        except requests.RequestException as e:
+            status = e.response.status_code if getattr(e, 'response', None) is not None else None
+            if isinstance(e, RobotsDisallowed) or (status is not None and 400 <= status < 500 and status != 429):
+                logger.info("Not retrying %s: %s", website, e)
+                await queue.run(queue.complete, job_id, ((),) * len(ENRICHMENT_COLUMNS))
+            else:
+                logger.warning("Error scraping %s: %s", website, e)
+                await queue.run(queue.fail, job_id, worker, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            logger.exception("Unexpected error scraping %s", website)
+            await queue.run(queue.fail, job_id, worker, f"{type(e).__name__}: {e}")
+        else:
+            await queue.run(queue.complete, job_id, result)
+            record_enrichment(website, result)
+        if on_done is not None:
+            on_done()
 
-    # Create the additional CSV file with one email per row
-    save_hubspot_upload_csv(combined_df)
+    try:
+        while not stop.is_set():
+            free = concurrency - len(running)
+            for job_id, key, website in await queue.run(queue.claim, worker, free) if free else ():
+                running[asyncio.ensure_future(work(job_id, website))] = job_id
+            if exit_when_idle and not running:
+                counts = await queue.run(queue.counts)
+                if not counts.get('pending') and not counts.get('leased'):
+                    logger.info("Queue is empty; worker %s exiting.", worker)
+                    break
+            if running and time.monotonic() - renewed > queue.visibility_timeout / 3:
+                await queue.run(queue.extend, list(running.values()), worker)
+                renewed = time.monotonic()
+            # Wake up when a scrape finishes, a stop is requested or it is time to poll again
+            waiters = [asyncio.ensure_future(stop.wait())]
+            done, _ = await asyncio.wait(list(running) + waiters, timeout=poll_interval,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+            for task in done:
+                if task in running:
+                    del running[task]
+                    task.result()
+    finally:
+        # Hand unfinished jobs straight back, so other workers need not wait for their leases to expire
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if running:
+            logger.info("Releasing %d unfinished jobs", len(running))
+            await queue.run(queue.release, list(running.values()), worker)
+
+async def enrich_restaurants(restaurants, fetcher, max_websites=50, window=8, cache=None):
+    """Stage 4: scrape emails and platforms from each restaurant website, `window` sites at a time.
+
+    Rows whose websites share a domain (see website_key) share one scrape,
+    and results in the EnrichmentCache are reused, so only new or stale
+    domains are scraped and count toward `max_websites`.
+    """
+    logger.info("Starting to extract emails and platforms from restaurant websites.")
+    results = {}  # domain -> future of its scrape result, shared by every row on the domain
+    websites_processed_count = 0  # Counter for unique websites scraped
+    position = 0
+
+    async def enrich(restaurant):
+        # Runs up to its first await in input order, so the limit and the
+        # duplicate check see restaurants in the same order as the stream
+        nonlocal websites_processed_count, position
+        position += 1
+        row = dict(restaurant, **dict.fromkeys(ENRICHMENT_COLUMNS))
+        logger.info("Processing restaurant %d: %s", position, restaurant['Name'])
+        website = restaurant.get('Website')
+        if not website:
+            logger.info("No website URL for %s", restaurant['Name'])
+            return row
+        domain = website_key(website) or normalize_url(website)
+        if domain in results:
+            logger.info("Reusing the result for %s on %s", domain, website)
+            metrics.count('sites_shared')
+            result = await results[domain]
+            if result is not None:
+                row.update(enrichment_fields(result))
+            return row
+        result = cache.get(domain) if cache is not None else None
+        if result is not None:
+            logger.info("Using the cached result for %s on %s", domain, website)
+            metrics.count('enrichment_cache_hits')
+            results[domain] = asyncio.get_running_loop().create_future()
+            results[domain].set_result(result)
+            row.update(enrichment_fields(result))
+            return row
+        if websites_processed_count >= max_websites:
+            return row
+        websites_processed_count += 1
+        if websites_processed_count == max_websites:
+            logger.info("Reached the maximum number of websites (%d). Later new sites are not enriched.", max_websites)
+        shared = results[domain] = asyncio.get_running_loop().create_future()
+        try:
+            with metrics.timer('enrich'):
+                result = await scrape_emails_and_platforms_from_website_async(website, fetcher=fetcher)
+            shared.set_result(result)
+        finally:
+            if not shared.done():
+                shared.set_result(None)
+        # An offline run only sees cached pages, so its results are not worth keeping
+        if cache is not None and not fetcher.offline:
+            cache.store(domain, website, result)
+        row.update(enrichment_fields(result))
+        record_enrichment(website, result)
+        return row
+
+    async for row in ordered_map(restaurants, enrich, window):
+        yield row
+    logger.info("Finished extracting emails and platforms.")
+
+async def enrich_restaurants_queued(restaurants, fetcher, queue, cache=None, local_worker=True, concurrency=8,
+                                    poll_interval=1.0):
+    """Stage 4 through a WorkQueue: queue each new or stale domain as its rows arrive, and yield rows as results come in.
+
+    Rows come out in the order their sites finish, not the input order; rows
+    without a website or with a cached result come out straight away. There
+    is no cap on the number of sites. With `local_worker` this process works
+    the queue too; more workers can join with `newmarkets.py worker`. Sites
+    that end up dead-lettered are left without enrichment.
+    """
+    logger.info("Queueing restaurant websites for enrichment in %s.", queue.path)
+    results = {}  # domain -> result, from the cache or the queue
+    waiting = {}  # domain -> (website, rows waiting for its result), for queued sites
+    ready = deque()
+    counts = Counter()
+    stop = asyncio.Event()
+    wake = asyncio.Event()
+    cursor = await queue.run(queue.finish_cursor)
+
+    def with_result(row, result):
+        if result is not None:
+            row.update(enrichment_fields(result))
+        return row
+
+    def settle(domain, result, finished_at):
+        website, rows = waiting.pop(domain)
+        results[domain] = result
+        # A result the queue already had keeps its age, so it expires on time
+        if result is not None and cache is not None:
+            cache.store(domain, website, result, fetched_at=finished_at)
+        ready.extend(with_result(row, result) for row in rows)
+
+    async def read():
+        async for restaurant in restaurants:
+            counts['rows'] += 1
+            row = dict(restaurant, **dict.fromkeys(ENRICHMENT_COLUMNS))
+            website = restaurant.get('Website')
+            domain = (website_key(website) or normalize_url(website)) if website else None
+            if domain in waiting:
+                waiting[domain][1].append(row)
+                continue
+            if domain is not None and domain not in results:
+                cached = cache.get(domain) if cache is not None else None
+                if cached is None:
+                    counts['queued'] += 1
+                    waiting[domain] = (website, [row])
+                    max_ages = (cache.ttl, cache.empty_ttl) if cache is not None else (None, None)
+                    if not await queue.run(queue.enqueue, domain, website, *max_ages):
+                        # Done recently, or already queued by another run; a done job finished before `cursor`
+                        finished = (await queue.run(queue.finished, [domain])).get(domain)
+                        if finished is not None:
+                            settle(domain, *finished)
+                    wake.set()
+                    continue
+                metrics.count('enrichment_cache_hits')
+                counts['cached'] += 1
+                results[domain] = cached
+            ready.append(with_result(row, results.get(domain)))
+            wake.set()
+
+    reader = asyncio.ensure_future(read())
+    worker = None
+    if local_worker:
+        worker = asyncio.ensure_future(run_worker(queue, fetcher, concurrency, poll_interval=poll_interval,
+                                                  stop=stop, on_done=wake.set))
+    reported = time.monotonic()
+    try:
+        while True:
+            while ready:
+                yield ready.popleft()
+            if reader.done():
+                reader.result()  # Re-raise whatever stopped the upstream stages
+                if not waiting:
+                    break
+            if worker is not None and worker.done():
+                worker.result()  # Re-raise whatever stopped the local worker
+            if waiting and time.monotonic() - reported > 60:
+                logger.info("Waiting for %d sites to be enriched (queue: %s)", len(waiting),
+                            await queue.run(queue.counts))
+                reported = time.monotonic()
+            try:
+                await asyncio.wait_for(wake.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            if waiting:
+                finished, cursor = await queue.run(queue.finished_since, cursor)
+                for domain, (result, finished_at) in finished.items():
+                    if domain in waiting:
+                        settle(domain, result, finished_at)
+    finally:
+        reader.cancel()
+        stop.set()
+        if worker is not None:
+            await worker
+    logger.info("Finished extracting emails and platforms: %d restaurants, %d sites queued, %d from the cache.",
+                counts['rows'], counts['queued'], counts['cached'])
+
+class CsvSink:
+    """Stage 5: append rows to restaurants.csv and the HubSpot upload file, flushing after each row."""
+
+    def __init__(self, filename='restaurants.csv', hubspot_filename='restaurants_hubspot_upload.csv', columns=OUTPUT_COLUMNS):
+        self.filename = filename
+        self.hubspot_filename = hubspot_filename
+        self.rows = 0
+        self._file = open(filename, 'w', newline='')
+        self._hubspot_file = open(hubspot_filename, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore')
+        self._hubspot_writer = csv.DictWriter(self._hubspot_file, fieldnames=columns, extrasaction='ignore')
+        self._writer.writeheader()
+        self._hubspot_writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        # Split the 'Emails' column into one row per email
+        for email in (row.get('Emails') or '').split(', '):
+            self._hubspot_writer.writerow(dict(row, Emails=email or None))
+        self._file.flush()
+        self._hubspot_file.flush()
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+        self._hubspot_file.close()
+        logger.info("Data saved to %s (%d rows)", self.filename, self.rows)
+        logger.info("Data saved to %s with one email per row.", self.hubspot_filename)
+
+def lead_keys(row):
+    """Keys that find a restaurant's stored entity across runs: its phone, website domain and street.
+
+    Rows with none of those fall back to their name. Several restaurants can
+    share a key (a group's reservations line or website), so LeadStore only
+    reuses an entity whose name is compatible with the row's.
+    """
+    keys = []
+    phone = e164_phone(row.get('Phone'))
+    if phone:
+        keys.append('phone:' + phone)
+    domain = website_key(row.get('Website'))
+    if domain:
+        keys.append('site:' + domain)
+    street = street_key(row.get('Address'))
+    if street:
+        keys.append('street:' + street)
+    name = normalize_name(row.get('Name'))
+    if not keys and name:
+        keys.append('name:' + name)
+    return keys
+
+def lead_name(stored, new):
+    """The name an entity keeps when a compatible row names it differently: the longer, most specific one."""
+    if not stored or not new:
+        return stored or new
+    return new if len(normalize_name(new) or '') > len(normalize_name(stored) or '') else stored
+
+def record_hash(record):
+    # Empty columns are left out, so adding a column does not make every stored lead look changed
+    return hashlib.sha1(json.dumps({k: v for k, v in record.items() if v is not None}, sort_keys=True).encode()).hexdigest()
+
+def hubspot_rows(record):
+    """Split the 'Emails' column into one row per email (a row with no email if there are none)."""
+    for email in (record.get('Emails') or '').split(', '):
+        yield dict(record, Emails=email or None)
+
+class LeadStore:
+    """Persistent SQLite store of every restaurant lead, upserted by entity.
+
+    A row is matched to a stored entity that shares one of its lead_keys()
+    and has a compatible name (names_match, the rule EntityIndex merges by),
+    so a restaurant keeps one entity across runs even when a later run finds
+    a phone or website the earlier one missed, or a longer or shorter form
+    of its name. Restaurants sharing a phone or website under different
+    names stay separate entities. Each entity records when it was first and
+    last seen and a hash of its columns, which tells new and changed leads
+    apart from unchanged ones. Columns a run leaves empty (a site that was
+    not enriched this time) keep their stored value.
+
+    The CSV outputs are views generated from the store, and the HubSpot file
+    is a delta: only email rows never exported before, or that changed since
+    they were, are written. Writers take an immediate transaction per row, so
+    several market processes can share one store file.
+    """
+
+    def __init__(self, path='.state/leads.sqlite', columns=OUTPUT_COLUMNS):
+        self.path = path
+        self.columns = columns
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                market TEXT,
+                record TEXT NOT NULL,
+                change_hash TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                changed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entities_last_seen ON entities (last_seen);
+            CREATE TABLE IF NOT EXISTS match_keys (
+                key TEXT NOT NULL,
+                entity_id INTEGER NOT NULL,
+                PRIMARY KEY (key, entity_id)
+            );
+            CREATE TABLE IF NOT EXISTS hubspot_exports (
+                entity_id INTEGER NOT NULL,
+                email TEXT NOT NULL,
+                row_hash TEXT NOT NULL,
+                exported_at REAL NOT NULL,
+                PRIMARY KEY (entity_id, email)
+            );
+        """)
+        if self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'entity_keys'").fetchone():
+            self._rebuild_match_keys()
+
+    def _rebuild_match_keys(self):
+        # Stores written before keys were shared between entities kept one name-qualified key per entity
+        with self._transaction():
+            self._db.execute('DELETE FROM match_keys')
+            for entity_id, record in self._db.execute('SELECT id, record FROM entities').fetchall():
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO match_keys VALUES (?, ?)',
+                    [(key, entity_id) for key in lead_keys(json.loads(record))],
+                )
+            self._db.execute('DROP TABLE entity_keys')
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def upsert(self, row, market=None):
+        """Insert or update the entity a row describes. Returns 'new', 'changed' or 'unchanged'."""
+        keys = lead_keys(row)
+        name = normalize_name(row.get('Name'))
+        now = time.time()
+        with self._transaction():
+            found = None
+            if keys:
+                placeholders = ', '.join('?' * len(keys))
+                candidates = self._db.execute(
+                    f'SELECT id, record FROM entities WHERE id IN '
+                    f'(SELECT entity_id FROM match_keys WHERE key IN ({placeholders})) ORDER BY id', keys
+                ).fetchall()
+                for entity_id, stored in candidates:
+                    stored_name = normalize_name(json.loads(stored).get('Name'))
+                    # A missing name cannot rule a match out
+                    if not name or not stored_name or names_match(name, stored_name):
+                        found = entity_id
+                        break
+            record = {column: row.get(column) or None for column in self.columns}
+            if found is None:
+                status = 'new'
+                entity_id = self._db.execute(
+                    'INSERT INTO entities (market, record, change_hash, first_seen, last_seen, changed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (market, json.dumps(record), record_hash(record), now, now, now),
+                ).lastrowid
+            else:
+                entity_id = found
+                stored, stored_hash = self._db.execute(
+                    'SELECT record, change_hash FROM entities WHERE id = ?', (entity_id,)
+                ).fetchone()
+                stored = json.loads(stored)
+                record = {column: record[column] or stored.get(column) for column in self.columns}
+                if 'Name' in record:
+                    record['Name'] = lead_name(stored.get('Name'), row.get('Name'))
+                change_hash = record_hash(record)
+                status = 'unchanged' if change_hash == stored_hash else 'changed'
+                self._db.execute(
+                    'UPDATE entities SET market = COALESCE(?, market), record = ?, change_hash = ?, last_seen = ?, '
+                    'changed_at = CASE WHEN change_hash = ? THEN changed_at ELSE ? END WHERE id = ?',
+                    (market, json.dumps(record), change_hash, now, change_hash, now, entity_id),
+                )
+            self._db.executemany(
+                'INSERT OR IGNORE INTO match_keys VALUES (?, ?)', [(key, entity_id) for key in keys]
+            )
+        metrics.count(f'leads_{status}')
+        return status
+
+    def entities(self, since=None, market=None):
+        """Stored entities as dicts (columns plus entity_id, market and timestamps), in last-seen order."""
+        query = 'SELECT id, market, record, change_hash, first_seen, last_seen, changed_at FROM entities WHERE 1 = 1'
+        params = []
+        if since is not None:
+            query += ' AND last_seen >= ?'
+            params.append(since)
+        if market is not None:
+            query += ' AND market = ?'
+            params.append(market)
+        for entity_id, entity_market, record, change_hash, first_seen, last_seen, changed_at in \
+                self._db.execute(query + ' ORDER BY last_seen, id', params).fetchall():
+            yield dict(
+                json.loads(record), entity_id=entity_id, Market=entity_market, change_hash=change_hash,
+                first_seen=first_seen, last_seen=last_seen, changed_at=changed_at,
+            )
+
+    def write_csv(self, filename, since=None, market=None, columns=None):
+        """Write the restaurants view (one row per entity). Returns the number of rows."""
+        count = 0
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns or self.columns, extrasaction='ignore')
+            writer.writeheader()
+            for entity in self.entities(since, market):
+                writer.writerow(entity)
+                count += 1
+        return count
+
+    def write_hubspot_csv(self, filename, market=None, columns=None, full=False):
+        """Write HubSpot rows (one per email) not exported yet or changed since, and mark them exported.
+
+        With `full`, every row is written. Returns the number of rows.
+        """
+        columns = columns or self.columns
+        exported = {
+            (entity_id, email): row_hash
+            for entity_id, email, row_hash in self._db.execute('SELECT entity_id, email, row_hash FROM hubspot_exports')
+        }
+        written = []
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            for entity in self.entities(market=market):
+                for row in hubspot_rows(entity):
+                    email = row['Emails'] or ''
+                    row_hash = record_hash({column: row.get(column) for column in self.columns})
+                    if full or exported.get((entity['entity_id'], email)) != row_hash:
+                        writer.writerow(row)
+                        written.append((entity['entity_id'], email, row_hash))
+        now = time.time()
+        with self._transaction():
+            self._db.executemany(
+                'INSERT OR REPLACE INTO hubspot_exports VALUES (?, ?, ?, ?)',
+                [(entity_id, email, row_hash, now) for entity_id, email, row_hash in written],
+            )
+        return len(written)
+
+    def export_parquet(self, path, market=None):
+        """Write every entity with its history columns to a Parquet file for analytics (needs pyarrow)."""
+        if pyarrow is None:
+            raise RuntimeError('Parquet export needs pyarrow (pip install pyarrow)')
+        rows = []
+        for entity in self.entities(market=market):
+            for column in ('first_seen', 'last_seen', 'changed_at'):
+                entity[column] = datetime.fromtimestamp(entity[column])
+            rows.append(entity)
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+        return len(rows)
+
+    def close(self):
+        self._db.close()
+
+class StoreSink:
+    """Stage 5 with a LeadStore: upsert each row, then regenerate the CSV views from the store on close.
+
+    restaurants.csv lists the entities seen by this run; the HubSpot file
+    holds only new or changed email rows unless `hubspot_full` is set, and is
+    skipped when `hubspot_filename` is None.
+    """
+
+    def __init__(self, store, filename='restaurants.csv', hubspot_filename='restaurants_hubspot_upload.csv',
+                 market=None, hubspot_full=False):
+        self.store = store
+        self.filename = filename
+        self.hubspot_filename = hubspot_filename
+        self.market = market
+        self.hubspot_full = hubspot_full
+        self.started = time.time()
+        self.rows = 0
+        self.counts = Counter()
+
+    def write(self, row):
+        self.counts[self.store.upsert(row, self.market)] += 1
+        self.rows += 1
+
+    def close(self):
+        self.store.write_csv(self.filename, since=self.started, market=self.market)
+        logger.info("Data saved to %s (%d rows: %d new, %d changed, %d unchanged)", self.filename, self.rows,
+                    self.counts['new'], self.counts['changed'], self.counts['unchanged'])
+        if self.hubspot_filename:
+            exported = self.store.write_hubspot_csv(self.hubspot_filename, market=self.market, full=self.hubspot_full)
+            logger.info("Saved %d %s email rows to %s.", exported, 'HubSpot' if self.hubspot_full else 'new or changed',
+                        self.hubspot_filename)
+
+async def run_pipeline(fetcher, state=None, sink=None, max_articles=5, max_websites=50, discovery='crawl', sources=None,
+                       enrichment_cache=None, queue=None, local_worker=True, enrich_concurrency=8):
+    """Run discover -> extract -> resolve -> enrich -> sink as a stream of bounded stages.
+
+    With a WorkQueue, enrichment goes through the queue and `max_websites` does not apply.
+    """
+    sink = sink or CsvSink()
+    try:
+        articles = discover_articles(fetcher, state, max_articles=max_articles, discovery=discovery, sources=sources)
+        restaurants = resolve_entities(extract_restaurants(articles, fetcher, state))
+        if queue is not None:
+            rows = enrich_restaurants_queued(restaurants, fetcher, queue, cache=enrichment_cache,
+                                             local_worker=local_worker, concurrency=enrich_concurrency)
+        else:
+            rows = enrich_restaurants(restaurants, fetcher, max_websites=max_websites, cache=enrichment_cache)
+        async for row in rows:
+            sink.write(row)
+    finally:
+        sink.close()
+
+async def main_async(fetcher=None, state=None, discovery='crawl', sources=None, sink=None, enrichment_cache=None,
+                     queue=None, local_worker=True, enrich_concurrency=8, max_websites=50):
+    fetcher = fetcher or AsyncFetcher()
+    logger.info("Starting to process Eater and The Infatuation data.")
+    # Limit to 5 articles per source for testing
+    await run_pipeline(fetcher, state, sink, max_articles=5, max_websites=max_websites, discovery=discovery,
+                       sources=sources, enrichment_cache=enrichment_cache, queue=queue, local_worker=local_worker,
+                       enrich_concurrency=enrich_concurrency)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Scrape new-market restaurant leads from Eater and The Infatuation. '
+                    'See `%(prog)s worker --help` for running extra enrichment workers.',
+        epilog='Pages are streamed through the pipeline, but entity resolution holds every extracted row '
+               'until extraction finishes: a later article can still merge into any restaurant. Website '
+               'enrichment and the CSV output start after that.')
+    parser.add_argument('--markets', default=DEFAULT_MARKET,
+                        help="Comma-separated markets from the market config to scrape, or 'all'.")
+    parser.add_argument('--markets-config', default=MARKETS_PATH, help='JSON file mapping each market to its sources.')
+    parser.add_argument('--market-workers', type=int, default=None,
+                        help='Processes running markets in parallel (default: one per market, up to the CPU count).')
+    parser.add_argument('--market-concurrency', type=int, default=16, help='Requests in flight per market.')
+    parser.add_argument('--cache-dir', default='.cache', help='Directory for the on-disk HTTP response cache.')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the HTTP response and enrichment caches.')
+    parser.add_argument('--cache-ttl', type=float, default=24, help='Hours before a cached response is revalidated.')
+    parser.add_argument('--enrichment-ttl', type=float, default=7 * 24,
+                        help='Hours before a website domain is scraped again for emails and platforms.')
+    parser.add_argument('--cache-max-mb', type=float, default=500, help='Maximum cache size before LRU eviction.')
+    parser.add_argument('--offline', action='store_true', help='Serve only from the cache and make no network calls.')
+    parser.add_argument('--state-db', default='.state/crawl_state.sqlite', help='SQLite file holding the resumable crawl state.')
+    parser.add_argument('--no-state', action='store_true', help='Do not persist crawl state between runs.')
+    parser.add_argument('--fresh', action='store_true', help='Start a new run instead of resuming an unfinished one.')
+    parser.add_argument('--incremental', action='store_true', help='Only fetch and extract articles not seen by earlier runs.')
+    parser.add_argument('--discovery', choices=DISCOVERY_MODES, default='crawl',
+                        help='Find articles by crawling, from sitemaps and RSS/Atom feeds, or feeds with a crawl fallback.')
+    parser.add_argument('--store-db', default='.state/leads.sqlite',
+                        help='SQLite lead store the CSV outputs are generated from.')
+    parser.add_argument('--no-store', action='store_true',
+                        help='Write the CSVs directly instead of through the lead store (no HubSpot delta).')
+    parser.add_argument('--hubspot-full', action='store_true',
+                        help='Write every email row to the HubSpot file, not only new or changed ones.')
+    parser.add_argument('--parquet', default=None, help='Also export the lead store to this Parquet file (needs pyarrow).')
+    parser.add_argument('--queue-db', default='.state/enrichment_queue.sqlite',
+                        help='SQLite work queue the website enrichment jobs go through.')
+    parser.add_argument('--no-queue', action='store_true',
+                        help='Enrich websites inline in this process, at most --max-websites of them. '
+                             '--offline runs always do.')
+    parser.add_argument('--max-websites', type=int, default=50,
+                        help='Websites enriched per market with --no-queue or --offline.')
+    parser.add_argument('--no-local-worker', action='store_true',
+                        help="Only queue websites and wait; leave the scraping to 'worker' processes.")
+    add_queue_args(parser)
+    add_log_args(parser)
+    parser.add_argument('--metrics-file', default=None, help='Also write the end-of-run metrics summary to this JSON file.')
+    return parser.parse_args(argv)
+
+def add_queue_args(parser):
+    parser.add_argument('--enrich-concurrency', type=int, default=8, help='Websites a worker scrapes at once.')
+    parser.add_argument('--lease-seconds', type=float, default=600,
+                        help='How long a claimed job stays invisible to other workers without a lease renewal.')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts before a job goes to the dead-letter table.')
+
+def add_log_args(parser):
+    parser.add_argument('--log-level', default='INFO', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'), help='Logging verbosity.')
+    parser.add_argument('--log-format', default='text', choices=('text', 'json'), help='Plain text or one JSON object per line.')
+
+def parse_worker_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='newmarkets.py worker',
+        description='Work the website enrichment queue. Start any number of these, on this machine or on others '
+                    'that share the queue file.')
+    parser.add_argument('--queue-db', default='.state/enrichment_queue.sqlite', help='SQLite work queue to work.')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between checks of an empty queue.')
+    parser.add_argument('--exit-when-idle', action='store_true', help='Exit once no job is pending or leased.')
+    add_queue_args(parser)
+    add_log_args(parser)
+    return parser.parse_args(argv)
+
+def worker_main(argv=None):
+    args = parse_worker_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    queue = WorkQueue(args.queue_db, visibility_timeout=args.lease_seconds, max_attempts=args.max_attempts)
+    fetcher = AsyncFetcher(max_concurrency=args.enrich_concurrency * 2)
+    try:
+        asyncio.run(run_worker(queue, fetcher, args.enrich_concurrency, poll_interval=args.poll_interval,
+                               exit_when_idle=args.exit_when_idle))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted. Unfinished jobs were released for other workers.")
+    finally:
+        metrics.report()
+        fetcher.close()
+        queue.close()
+
+def market_path(path, market, per_market):
+    """Give each market its own copy of a file (restaurants.csv -> restaurants_houston.csv) when running several."""
+    if not per_market:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}_{market}{extension}"
+
+def run_market(market, args, per_market=False):
+    """Scrape one market with its own cache, crawl state, fetcher and output files. Runs in a worker process."""
+    setup_logging(args.log_level, args.log_format)
+    if per_market:
+        LogContext.fields = {'market': market}
+    metrics.reset()
+    sources = market_sources(market, args.markets_config)
+    cache = None
+    enrichment_cache = None
+    if not args.no_cache:
+        cache = ResponseCache(
+            path=market_path(os.path.join(args.cache_dir, 'http_cache.sqlite'), market, per_market),
+            default_ttl=args.cache_ttl * 3600,
+            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        )
+        # Shared by all markets: a restaurant group's domain is scraped once for every market listing it
+        enrichment_cache = EnrichmentCache(
+            os.path.join(args.cache_dir, 'enrichment.sqlite'),
+            ttl=args.enrichment_ttl * 3600,
+            empty_ttl=min(args.enrichment_ttl, 24) * 3600,
+        )
+    state = None
+    if not args.no_state:
+        state = CrawlState(market_path(args.state_db, market, per_market), incremental=args.incremental)
+        state.begin_run(fresh=args.fresh)
+    fetcher = AsyncFetcher(max_concurrency=args.market_concurrency, cache=cache, offline=args.offline)
+    queue = None
+    if not args.no_queue and not args.offline:
+        # Shared by all markets and by any worker processes. Offline runs enrich inline from the response cache
+        # instead, so results made only of cached pages never reach the shared queue.
+        queue = WorkQueue(args.queue_db, visibility_timeout=args.lease_seconds, max_attempts=args.max_attempts)
+    store = None
+    if args.no_store:
+        sink = CsvSink(market_path('restaurants.csv', market, per_market),
+                       market_path('restaurants_hubspot_upload.csv', market, per_market))
+    else:
+        # Markets share one store; with several, main() writes the combined HubSpot delta afterwards
+        store = LeadStore(args.store_db)
+        sink = StoreSink(store, market_path('restaurants.csv', market, per_market),
+                         None if per_market else 'restaurants_hubspot_upload.csv',
+                         market=market, hubspot_full=args.hubspot_full)
+    status = 'failed'
+    try:
+        asyncio.run(main_async(fetcher, state, discovery=args.discovery, sources=sources, sink=sink,
+                               enrichment_cache=enrichment_cache, queue=queue, local_worker=not args.no_local_worker,
+                               enrich_concurrency=args.enrich_concurrency, max_websites=args.max_websites))
+        status = 'completed'
+    except KeyboardInterrupt:
+        logger.warning("Interrupted %s. Progress is saved; run again to resume.", market)
+        status = 'interrupted'
+    finally:
+        if state is not None:
+            state.finish_run(status)
+        summary = metrics.report(cache)
+        if args.metrics_file:
+            with open(market_path(args.metrics_file, market, per_market), 'w') as f:
+                json.dump(dict(summary, market=market, status=status), f, indent=2)
+        fetcher.close()
+        if state is not None:
+            state.close()
+        if store is not None:
+            store.close()
+        if enrichment_cache is not None:
+            enrichment_cache.close()
+        if queue is not None:
+            queue.close()
+    return {'market': market, 'status': status, 'filename': sink.filename, 'rows': sink.rows}
+
+def merge_market_outputs(results, filename='restaurants.csv', hubspot_filename='restaurants_hubspot_upload.csv'):
+    """Combine per-market CSVs into the main output files, resolving restaurants listed in several markets."""
+    index = EntityIndex()
+    for result in results:
+        with open(result['filename'], newline='') as f:
+            for row in csv.DictReader(f):
+                index.add(dict({column: value or None for column, value in row.items()}, Market=result['market']))
+    sink = CsvSink(filename, hubspot_filename, columns=['Market'] + OUTPUT_COLUMNS)
+    try:
+        for entity in index.entities():
+            sink.write(entity)
+    finally:
+        sink.close()
+
+def export_store(args, since=None):
+    """Generate the combined outputs of a multi-market run (`since` its start) and the Parquet export from the store."""
+    if args.no_store:
+        return
+    store = LeadStore(args.store_db)
+    try:
+        if since is not None:
+            # Entities are already matched across markets by the store's keys
+            rows = store.write_csv('restaurants.csv', since=since, columns=['Market'] + OUTPUT_COLUMNS)
+            logger.info("Data saved to restaurants.csv (%d rows)", rows)
+            exported = store.write_hubspot_csv('restaurants_hubspot_upload.csv', columns=['Market'] + OUTPUT_COLUMNS,
+                                               full=args.hubspot_full)
+            logger.info("Saved %d email rows to restaurants_hubspot_upload.csv.", exported)
+        if args.parquet:
+            logger.info("Exported %d leads to %s", store.export_parquet(args.parquet), args.parquet)
+    finally:
+        store.close()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['worker']:
+        worker_main(argv[1:])
+        return
+    args = parse_args(argv)
+    setup_logging(args.log_level, args.log_format)
+    if args.no_cache and args.offline:
+        raise SystemExit('--offline requires the response cache')
+    if args.parquet and (args.no_store or pyarrow is None):
+        raise SystemExit('--parquet requires the lead store and pyarrow (pip install pyarrow)')
+    try:
+        known_markets = load_markets(args.markets_config)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot read market config {args.markets_config}: {e}")
+    markets = list(known_markets) if args.markets == 'all' else [m.strip() for m in args.markets.split(',') if m.strip()]
+    unknown = [market for market in markets if market not in known_markets]
+    if unknown or not markets:
+        raise SystemExit(f"Unknown markets: {', '.join(unknown)}; known markets: {', '.join(sorted(known_markets))}")
+
+    started = time.time()
+    if len(markets) == 1:
+        run_market(markets[0], args)
+        export_store(args)
+        return
+
+    # Each market runs in its own process with its own event loop and I/O limits
+    workers = args.market_workers or min(len(markets), os.cpu_count() or 1)
+    logger.info("Scraping %d markets with %d worker processes.", len(markets), workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_market, market, args, True): market for market in markets}
+        try:
+            for future in as_completed(futures):
+                market = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error("Market %s failed: %s", market, e)
+                    continue
+                logger.info("Market %s %s: %d rows in %s", market, result['status'], result['rows'], result['filename'])
+                results.append(result)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted. Progress is saved; run again to resume.")
+            pool.shutdown(wait=True, cancel_futures=True)
+    results.sort(key=lambda result: markets.index(result['market']))
+    if args.no_store:
+        merge_market_outputs(results)
+    else:
+        export_store(args, since=started)
 
 if __name__ == "__main__":
     main()
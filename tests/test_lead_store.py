@@ -0,0 +1,50 @@
+import pytest
+
+import newmarkets as nm
+
+KNIFE = {'Name': 'Knife Steakhouse', 'Address': '5300 E Mockingbird Ln, Dallas, TX 75206', 'Phone': '(214) 443-9339',
+         'Website': 'https://knifedallas.com/'}
+
+@pytest.fixture
+def store(tmp_path):
+    store = nm.LeadStore(str(tmp_path / 'leads.sqlite'))
+    yield store
+    store.close()
+
+def test_upsert_reports_new_changed_and_unchanged(store):
+    assert store.upsert(KNIFE, 'dallas') == 'new'
+    assert store.upsert(KNIFE, 'dallas') == 'unchanged'
+    assert store.upsert(dict(KNIFE, Emails='info@knifedallas.com'), 'dallas') == 'changed'
+    # A later run that did not enrich the site keeps the stored email
+    assert store.upsert(KNIFE, 'dallas') == 'unchanged'
+    [entity] = store.entities()
+    assert entity['Emails'] == 'info@knifedallas.com'
+
+def test_restaurants_sharing_a_phone_stay_separate(store):
+    assert store.upsert(KNIFE) == 'new'
+    assert store.upsert({'Name': 'Town Hearth', 'Phone': KNIFE['Phone']}) == 'new'
+    assert sorted(entity['Name'] for entity in store.entities()) == ['Knife Steakhouse', 'Town Hearth']
+
+def test_longer_and_shorter_names_of_one_restaurant_share_an_entity(store):
+    assert store.upsert(dict(KNIFE, Name='Knife')) == 'new'
+    assert store.upsert(KNIFE) == 'changed'
+    # Whichever form arrives first in later runs, the longer name is kept
+    assert store.upsert(dict(KNIFE, Name='Knife')) == 'unchanged'
+    assert store.upsert(KNIFE) == 'unchanged'
+    [entity] = store.entities()
+    assert entity['Name'] == 'Knife Steakhouse'
+
+def test_a_different_name_on_a_shared_phone_is_matched_to_its_own_entity(store):
+    store.upsert(KNIFE)
+    store.upsert({'Name': 'Town Hearth', 'Phone': KNIFE['Phone']})
+    assert store.upsert({'Name': 'Town Hearth', 'Phone': KNIFE['Phone']}) == 'unchanged'
+    assert store.upsert(KNIFE) == 'unchanged'
+
+def test_hubspot_export_only_writes_new_and_changed_rows(store, tmp_path):
+    hubspot = str(tmp_path / 'hubspot.csv')
+    store.upsert(KNIFE)
+    assert store.write_hubspot_csv(hubspot) == 1
+    assert store.write_hubspot_csv(hubspot) == 0
+    store.upsert(dict(KNIFE, Emails='info@knifedallas.com, events@knifedallas.com'))
+    assert store.write_hubspot_csv(hubspot) == 2
+    assert store.write_hubspot_csv(hubspot, full=True) == 2
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import newmarkets as nm
+
+EMPTY = ((),) * len(nm.ENRICHMENT_COLUMNS)
+FOUND = (('hello@venue.com',),) + ((),) * (len(nm.ENRICHMENT_COLUMNS) - 1)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = nm.WorkQueue(str(tmp_path / 'queue.sqlite'), visibility_timeout=60, max_attempts=2, clock=clock)
+    queue.RETRY_BACKOFF = 0
+    yield queue
+    queue.close()
+
+def test_leased_job_is_claimed_again_after_its_lease_expires(queue, clock):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    [(job_id, key, website)] = queue.claim('crashed', 5)
+    assert queue.claim('other', 5) == []
+    clock.now += 61
+    assert queue.claim('other', 5) == [(job_id, 'venue.com', 'https://venue.com/')]
+
+def test_extend_keeps_a_lease(queue, clock):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    [(job_id, _, _)] = queue.claim('busy')
+    clock.now += 50
+    queue.extend([job_id], 'busy')
+    clock.now += 50
+    assert queue.claim('other') == []
+
+def test_release_hands_back_only_the_workers_own_jobs(queue):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    [(job_id, _, _)] = queue.claim('stopping')
+    queue.release([job_id], 'someone-else')
+    assert queue.claim('other') == []
+    queue.release([job_id], 'stopping')
+    assert queue.claim('other') == [(job_id, 'venue.com', 'https://venue.com/')]
+    # The released attempt is not counted against max_attempts
+    queue.fail(job_id, 'other', 'HTTPError: 503')
+    assert queue.claim('other')
+
+def test_failed_job_is_dead_lettered_after_max_attempts(queue, clock):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    for attempt in range(2):
+        [(job_id, _, _)] = queue.claim('worker')
+        queue.fail(job_id, 'worker', 'HTTPError: 503')
+    assert queue.claim('worker') == []
+    assert queue.counts() == {'dead': 1}
+    assert queue.finished(['venue.com'])['venue.com'][0] is None
+    assert queue.dead_letters() == [('venue.com', 'https://venue.com/', 2, 'HTTPError: 503', clock.now)]
+
+def test_expired_last_lease_is_dead_lettered(queue, clock):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    for attempt in range(2):
+        assert queue.claim('crashed')
+        clock.now += 61
+    assert queue.claim('worker') == []
+    assert queue.counts() == {'dead': 1}
+
+def test_first_result_wins(queue, clock):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    [(job_id, _, _)] = queue.claim('slow')
+    clock.now += 61
+    assert queue.claim('fast')
+    queue.complete(job_id, FOUND)
+    queue.complete(job_id, EMPTY)
+    result, finished_at = queue.finished(['venue.com'])['venue.com']
+    assert result == tuple(list(values) for values in FOUND)
+
+def test_enqueue_reuses_done_jobs_until_they_are_stale(queue, clock):
+    for key, result in (('found.com', FOUND), ('empty.com', EMPTY)):
+        queue.enqueue(key, f'https://{key}/')
+        [(job_id, _, _)] = queue.claim('worker')
+        queue.complete(job_id, result)
+    clock.now += 10
+    assert not queue.enqueue('found.com', 'https://found.com/', max_age=60, empty_max_age=5)
+    assert queue.enqueue('empty.com', 'https://empty.com/', max_age=60, empty_max_age=5)
+    assert queue.enqueue('found.com', 'https://found.com/')
+
+def test_finished_since_returns_each_finish_once(queue):
+    cursor = queue.finish_cursor()
+    for key in ('a.com', 'b.com'):
+        queue.enqueue(key, f'https://{key}/')
+        [(job_id, _, _)] = queue.claim('worker')
+        queue.complete(job_id, EMPTY)
+    finished, cursor = queue.finished_since(cursor)
+    assert sorted(finished) == ['a.com', 'b.com']
+    assert queue.finished_since(cursor) == ({}, cursor)
+    # A job queued again and finished again comes after the cursor, even though it was the newest finish
+    queue.enqueue('b.com', 'https://b.com/')
+    [(job_id, _, _)] = queue.claim('worker')
+    queue.complete(job_id, FOUND)
+    finished, cursor = queue.finished_since(cursor)
+    assert list(finished) == ['b.com']
+
+def test_worker_releases_unfinished_jobs_when_stopped(queue, monkeypatch):
+    async def hang(website, fetcher, raise_errors):
+        await asyncio.Event().wait()
+
+    async def run(fetcher):
+        stop = asyncio.Event()
+        worker = asyncio.ensure_future(nm.run_worker(queue, fetcher, worker='stopping', poll_interval=0.01, stop=stop))
+        while not queue.counts().get('leased'):
+            await asyncio.sleep(0.01)
+        stop.set()
+        await worker
+
+    monkeypatch.setattr(nm, 'scrape_emails_and_platforms_from_website_async', hang)
+    queue.enqueue('venue.com', 'https://venue.com/')
+    fetcher = nm.AsyncFetcher()
+    try:
+        asyncio.run(run(fetcher))
+    finally:
+        fetcher.close()
+    assert queue.counts() == {'pending': 1}
+    assert queue.claim('other')
+
+def test_offline_fetcher_cannot_work_the_queue(queue, tmp_path):
+    queue.enqueue('venue.com', 'https://venue.com/')
+    cache = nm.ResponseCache(str(tmp_path / 'cache.sqlite'))
+    fetcher = nm.AsyncFetcher(cache=cache, offline=True)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(nm.run_worker(queue, fetcher, exit_when_idle=True))
+    finally:
+        fetcher.close()
+        cache.close()
+    assert queue.counts() == {'pending': 1}